@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects single inference requests for up to ``max_wait`` seconds (or
+    ``max_batch`` items) and runs them as one ``predict`` call in ``executor``.
+
+    Each caller awaits ``submit(window)`` and gets back its own row of the
+    batched output. While a batch is running, new requests queue up and form
+    the next batch, so throughput grows with load instead of per-call overhead.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        executor: Optional[Executor] = None,
+        max_batch: int = 64,
+        max_wait: float = 0.005,
+    ):
+        self.predict = predict
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Workers detached by close() that are still draining their queue
+        self._draining = set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run(self._queue))
+
+    def close(self) -> None:
+        """
+        Let the current worker finish the requests already queued and exit.
+        A later ``submit`` starts a fresh worker.
+        """
+        if self._task is not None and not self._task.done():
+            self._queue.put_nowait(None)
+            self._draining.add(self._task)
+            self._task.add_done_callback(self._draining.discard)
+        self._task = None
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Fail anything still waiting so callers do not hang on shutdown
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("inference batcher stopped"))
+
+    async def submit(self, window: np.ndarray) -> np.ndarray:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((window, future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> list:
+        """Next batch; a trailing None marks a close() request."""
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch and batch[-1] is not None:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            batch = await self._collect(queue)
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            # Skip callers that gave up while waiting
+            batch = [(window, future) for window, future in batch if not future.done()]
+            if not batch:
+                continue
+            inputs = np.stack([window for window, _ in batch])
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.predict, inputs)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
@@ -0,0 +1,81 @@
+import asyncio
+from typing import AsyncIterator, Optional, Set
+
+
+class SubscriberLimitError(Exception):
+    """Raised when a broadcaster already has ``max_subscribers`` streams open."""
+
+
+def sse_message(data: bytes, event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Event; ``data`` must be a single line (e.g. compact JSON)."""
+    head = b""
+    if event_id is not None:
+        head += b"id: " + event_id.encode() + b"\n"
+    if event is not None:
+        head += b"event: " + event.encode() + b"\n"
+    return head + b"data: " + data + b"\n\n"
+
+
+class Broadcaster:
+    """
+    Fans each published event out to every open Server-Sent Events stream.
+
+    An event is encoded once and the same bytes are handed to all
+    subscribers, so a publish costs one queue put per subscriber. Each
+    subscriber buffers only the newest event: a slow client skips
+    intermediate ones instead of growing memory. New subscribers first get
+    the latest event, unless their ``Last-Event-ID`` shows they already have it.
+    """
+
+    def __init__(self, max_subscribers: int = 1000, keepalive: float = 15.0):
+        self.max_subscribers = max_subscribers
+        self.keepalive = keepalive
+        self.last: Optional[bytes] = None
+        self.last_id: Optional[str] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def publish(self, data: bytes, event: str = "message", event_id: Optional[str] = None) -> None:
+        message = sse_message(data, event, event_id)
+        self.last, self.last_id = message, event_id
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> asyncio.Queue:
+        if self.full:
+            raise SubscriberLimitError(f"{self.max_subscribers} streams already open")
+        queue = asyncio.Queue(maxsize=1)
+        if self.last is not None and (last_event_id is None or last_event_id != self.last_id):
+            queue.put_nowait(self.last)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Subscribe and yield events, with keep-alive comments while idle, until
+        the consumer stops iterating. Subscribing here rather than up front
+        means a stream that is never iterated never holds a slot.
+        """
+        queue = self.subscribe(last_event_id)
+        try:
+            # Tell EventSource clients how long to wait before reconnecting
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(queue)
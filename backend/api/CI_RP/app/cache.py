@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def next_refresh(now: float, period: int, grace: int) -> float:
+    """Epoch seconds of the next upstream refresh: the next period boundary plus a grace delay."""
+    return (now // period + 1) * period + grace
+
+
+class TTLCache:
+    """
+    In-process cache whose entries expire at the next upstream refresh.
+
+    Concurrent misses for the same key are coalesced ("single-flight"):
+    the first caller starts the load, every other caller awaits that same
+    task, so a burst of N requests produces exactly one upstream call.
+
+    Expired values are kept as the last good copy: ``get_or_revalidate``
+    returns them immediately (flagged stale) while a background load
+    refreshes the entry, and ``get_or_refresh`` falls back to them only
+    when the load fails.
+    """
+
+    def __init__(self, period: int = 3600, grace: int = 120):
+        self.period = period
+        self.grace = grace
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def get(self, key: Hashable) -> Any:
+        value, fresh = self.lookup(key)
+        return value if fresh else None
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """Return (value, fresh); value is the last good copy even after expiry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        return entry[0], entry[1] > time.time()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, next_refresh(time.time(), self.period, self.grace))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def expire(self) -> None:
+        """Mark every entry stale without dropping the last good values."""
+        self._entries = {key: (value, 0.0) for key, (value, _) in self._entries.items()}
+
+    async def get_or_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Shield so a cancelled caller does not cancel the shared load
+        return await asyncio.shield(self._start(key, fetch))
+
+    async def get_or_revalidate(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Stale-while-revalidate lookup returning (value, stale).
+
+        A fresh hit is returned as is. An expired entry is returned at once
+        with stale=True while a background load refreshes it; only a key
+        with no last good value waits for (and may raise from) the load.
+        """
+        value, fresh = self.lookup(key)
+        if fresh:
+            return value, False
+        task = self._start(key, fetch)
+        if value is not None:
+            return value, True
+        return await asyncio.shield(task), False
+
+    async def get_or_refresh(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Lookup returning (value, stale) that waits for the load of an expired
+        entry, like ``get_or_fetch``. The last good value is returned (with
+        stale=True) only if that load fails; without one the error is raised.
+        """
+        value, fresh = self.lookup(key)
+        if fresh:
+            return value, False
+        try:
+            return await asyncio.shield(self._start(key, fetch)), False
+        except Exception:
+            if value is None:
+                raise
+            return value, True
+
+    def _start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, fetch))
+            # Background loads may have no awaiter; retrieve their errors
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,49 @@
+"""
+HTTP conditional-request helpers (ETag / Last-Modified / Cache-Control).
+
+Forecast bodies only change when the upstream values (a new hour, or a
+revision of one) or the models change, so polling clients can revalidate with If-None-Match or
+If-Modified-Since and receive an empty 304 instead of the full payload.
+ETags are weak: the gzip and identity encodings of a body share one tag,
+which is only valid for semantically equivalent representations.
+"""
+import hashlib
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given parts (data timestamp and digest, model version, representation)."""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def http_date(ts: datetime) -> str:
+    return formatdate(ts.timestamp(), usegmt=True)
+
+
+def not_modified(headers: Mapping[str, str], etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current resource."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # GET uses weak comparison: ignore the W/ prefix on both sides
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second precision
+        return int(last_modified.timestamp()) <= int(since.timestamp())
+    return False
+
+
+def max_age(next_update: float) -> int:
+    """Seconds until the next expected upstream refresh (never negative)."""
+    return max(0, int(next_update - time.time()))
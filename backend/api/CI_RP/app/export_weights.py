@@ -0,0 +1,118 @@
+"""
+Export a saved ``.keras`` model to the compact ``.npz`` format read by
+``electricitymap.lstm_numpy.NumpyModel``.
+
+The archive is read directly (config.json + model.weights.h5), so exporting
+needs h5py but not TensorFlow.
+
+Usage (from backend/api/CI_RP):
+    python -m app.export_weights models/carbon_intensity/model_carbon_intensity.keras
+"""
+import argparse
+import io
+import json
+import os
+import zipfile
+
+import h5py
+import numpy as np
+
+# Keras class name -> (engine layer type, weight names in saved order).
+# The engine type doubles as the group name Keras 3 uses in model.weights.h5.
+SUPPORTED = {
+    "LSTM": ("lstm", ["kernel", "recurrent_kernel", "bias"]),
+    "Dense": ("dense", ["kernel", "bias"]),
+    "BatchNormalization": (
+        "batch_normalization",
+        ["gamma", "beta", "moving_mean", "moving_variance"],
+    ),
+}
+# Layers that are identities at inference time
+SKIPPED = {"InputLayer", "Dropout"}
+
+
+def _layer_weights(h5: h5py.File, class_name: str, path: str, config: dict) -> list:
+    group = h5["layers"][path]
+    if class_name == "LSTM":
+        group = group["cell"]
+    arrays = [group["vars"][str(i)][()] for i in range(len(group["vars"]))]
+    names = SUPPORTED[class_name][1]
+    if class_name == "LSTM" and not config.get("use_bias", True):
+        names = names[:2]
+    elif class_name == "Dense" and not config.get("use_bias", True):
+        names = names[:1]
+    elif class_name == "BatchNormalization":
+        names = [
+            n
+            for n in names
+            if (n != "gamma" or config.get("scale", True))
+            and (n != "beta" or config.get("center", True))
+        ]
+    if len(names) != len(arrays):
+        raise ValueError(f"{path}: expected {len(names)} weights, found {len(arrays)}")
+    return list(zip(names, arrays))
+
+
+def export_keras(keras_path: str, npz_path: str = None) -> str:
+    """Write the weights of a Sequential ``.keras`` model to ``npz_path`` and return it."""
+    npz_path = npz_path or os.path.splitext(keras_path)[0] + ".npz"
+    with zipfile.ZipFile(keras_path) as archive:
+        config = json.loads(archive.read("config.json"))
+        weights_bytes = archive.read("model.weights.h5")
+
+    if config["class_name"] != "Sequential":
+        raise ValueError(f"Only Sequential models are supported, got {config['class_name']}")
+
+    layers, arrays, seen = [], {}, {}
+    with h5py.File(io.BytesIO(weights_bytes), "r") as h5:
+        for layer in config["config"]["layers"]:
+            class_name, cfg = layer["class_name"], layer["config"]
+            # Keras 3 stores weights under the snake_cased class name, suffixed
+            # by occurrence (lstm, lstm_1, ...), regardless of the layer's own name
+            count = seen.get(class_name, 0)
+            seen[class_name] = count + 1
+            if class_name in SKIPPED:
+                continue
+            if class_name not in SUPPORTED:
+                raise ValueError(f"Unsupported layer type: {class_name}")
+            path = SUPPORTED[class_name][0] + (f"_{count}" if count else "")
+            named = _layer_weights(h5, class_name, path, cfg)
+
+            spec = {"type": SUPPORTED[class_name][0], "weights": [n for n, _ in named]}
+            if class_name == "LSTM":
+                if cfg.get("go_backwards") or cfg.get("return_state"):
+                    raise ValueError(f"{path}: go_backwards/return_state are not supported")
+                spec.update(
+                    units=cfg["units"],
+                    activation=cfg["activation"],
+                    recurrent_activation=cfg["recurrent_activation"],
+                    return_sequences=cfg["return_sequences"],
+                )
+            elif class_name == "Dense":
+                spec.update(activation=cfg["activation"])
+            else:
+                spec.update(epsilon=cfg["epsilon"])
+
+            index = len(layers)
+            layers.append(spec)
+            for name, array in named:
+                arrays[f"{index}/{name}"] = array.astype(np.float32)
+
+    np.savez(npz_path, layers=np.array(json.dumps(layers)), **arrays)
+    return npz_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("models", nargs="+", help="Paths to .keras files")
+    parser.add_argument("-o", "--output", help="Output path (single model only)")
+    args = parser.parse_args()
+    if args.output and len(args.models) > 1:
+        parser.error("--output can only be used with a single model")
+    for path in args.models:
+        out = export_keras(path, args.output)
+        print(f"{path} -> {out} ({os.path.getsize(out) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    zone TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    data_time INTEGER NOT NULL,
+    window_hash TEXT NOT NULL,
+    scaled_inputs TEXT NOT NULL,
+    probabilities TEXT NOT NULL,
+    prediction_class INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    stale INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (zone, signal, data_time, window_hash, model_version)
+);
+CREATE INDEX IF NOT EXISTS predictions_zone_time ON predictions (zone, data_time);
+CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created_at);
+"""
+
+
+def window_hash(values) -> str:
+    """Stable hash of a raw (unscaled) input window."""
+    return hashlib.sha256(np.asarray(values, dtype=np.float64).tobytes()).hexdigest()[:32]
+
+
+def _epoch(ts) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp())
+
+
+class PredictionLedger:
+    """
+    Append-only SQLite store of every forecast the API computes.
+
+    Each row keeps the input window hash, the scaled inputs, the softmax
+    vector, the class, the model version and the data hour it forecasts
+    from. Recomputing the same window with the same model is ignored
+    rather than duplicated. All database work runs on one background
+    thread, so ``record`` never blocks the event loop and writes stay ordered.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record(
+        self,
+        zone: str,
+        signal: str,
+        data_time: datetime,
+        values,
+        scaled: list,
+        probabilities,
+        prediction_class: int,
+        model_version: str,
+        stale: bool = False,
+    ) -> Future:
+        """Queue one prediction for writing; returns the write's Future."""
+        row = (
+            zone,
+            signal,
+            _epoch(data_time),
+            window_hash(values),
+            json.dumps([round(float(v), 6) for v in scaled]),
+            json.dumps([float(p) for p in np.ravel(probabilities)]),
+            int(prediction_class),
+            model_version,
+            int(stale),
+            time.time(),
+        )
+        return self._executor.submit(self._insert, row)
+
+    def _insert(self, row: tuple) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO predictions (zone, signal, data_time, window_hash, "
+                "scaled_inputs, probabilities, prediction_class, model_version, stale, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def query(
+        self,
+        zone: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        signal: Optional[str] = None,
+        limit: int = 1000,
+    ) -> Future:
+        """Predictions for a zone with data time in [start, end), oldest first."""
+        return self._executor.submit(self._select, zone, start, end, signal, limit)
+
+    def _select(self, zone, start, end, signal, limit) -> list:
+        sql = "SELECT * FROM predictions WHERE zone = ?"
+        params = [zone]
+        if start is not None:
+            sql += " AND data_time >= ?"
+            params.append(_epoch(start))
+        if end is not None:
+            sql += " AND data_time < ?"
+            params.append(_epoch(end))
+        if signal is not None:
+            sql += " AND signal = ?"
+            params.append(signal)
+        sql += " ORDER BY data_time, signal, id LIMIT ?"
+        params.append(limit)
+        conn = self._connection()
+        cursor = conn.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        rows = []
+        for values in cursor.fetchall():
+            row = dict(zip(columns, values))
+            rows.append(
+                {
+                    "datetime": datetime.fromtimestamp(row["data_time"], timezone.utc).isoformat(),
+                    "signal": row["signal"],
+                    "prediction_class": row["prediction_class"],
+                    "probabilities": json.loads(row["probabilities"]),
+                    "scaled_inputs": json.loads(row["scaled_inputs"]),
+                    "window_hash": row["window_hash"],
+                    "model_version": row["model_version"],
+                    "stale": bool(row["stale"]),
+                    "created_at": datetime.fromtimestamp(row["created_at"], timezone.utc).isoformat(),
+                }
+            )
+        return rows
+
+    def close(self) -> None:
+        """Finish pending writes and close the database."""
+        self._executor.submit(self._close).result()
+        self._executor.shutdown(wait=True)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
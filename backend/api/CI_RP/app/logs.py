@@ -0,0 +1,38 @@
+"""
+Structured, sampled event logs.
+
+Each event is one JSON line on the ``app.events`` logger. Routine events
+are kept with probability ``LOG_SAMPLE_RATE`` so hot paths do not flood the
+logs; warnings and errors are always written.
+"""
+import json
+import logging
+import os
+import random
+import time
+
+# Fraction of routine (INFO/DEBUG) events written; 1 keeps them all, 0 none
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+logger = logging.getLogger("app.events")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, sample: float = None, **fields) -> None:
+    """Write ``event`` with ``fields`` as a JSON line, sampled unless it is a warning or worse."""
+    if not logger.isEnabledFor(level):
+        return
+    rate = LOG_SAMPLE_RATE if sample is None else sample
+    if level < logging.WARNING and random.random() >= rate:
+        return
+    record = {"ts": round(time.time(), 3), "level": logging.getLevelName(level), "event": event}
+    if level < logging.WARNING and rate < 1:
+        # Lets log queries scale sampled counts back up
+        record["sample_rate"] = rate
+    record.update(fields)
+    logger.log(level, json.dumps(record, default=str))
@@ -1,9 +1,66 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.utils import get_renewable_percentage, get_carbon_intensity
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from electricitymap import ElectricityMapError
+from app.broadcast import SubscriberLimitError
+from app.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, STAGE_SECONDS, render_metrics
+from app.conditional import http_date, make_etag, max_age, not_modified
+from app.resilience import CircuitOpenError, UpstreamDataError
+from app.serialization import LAYOUTS, TIMESTAMPS, dumps, render
+from app.utils import (
+    BATCH_PREDICT_MAX_BYTES,
+    GZIP_MIN_SIZE,
+    REGION,
+    forecast_digest,
+    get_zone_forecast,
+    model_version,
+    normalize_zone,
+    parse_windows,
+    predict_windows_async,
+    query_history,
+    query_predictions,
+    start_http_client,
+    close_http_client,
+    close_history_store,
+    close_ledger,
+    close_registry,
+    forecast_stream,
+    load_registry,
+    readiness,
+    start_refresher,
+    stop_refresher,
+)
 import uvicorn
 
-app = FastAPI(title="Energy Forecast API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client per worker, opened before serving traffic
+    await start_http_client()
+    # Load and warm the models in the background so the worker accepts
+    # connections at once; /readyz reports 503 until they are ready
+    loader = asyncio.ensure_future(load_registry())
+    # Hourly background refresh; handlers only read the precomputed forecast
+    await start_refresher()
+    yield
+    await stop_refresher()
+    loader.cancel()
+    await close_registry()
+    close_ledger()
+    await close_http_client()
+    close_history_store()
+
+
+app = FastAPI(title="Energy Forecast API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -12,7 +69,146 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Age", "X-Data-Timestamp", "X-Stale", "ETag", "Last-Modified"],
 )
+# Compress larger bodies (full histories, batch predictions) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+
+class InstrumentMiddleware:
+    """
+    Track in-flight requests and latency per route template (not per raw path).
+
+    A plain ASGI middleware, so a request counts as in flight until its last
+    body chunk is sent (or the client goes away), not only until the handler
+    returns a streamed response (SSE, gzip). Latency is measured up to the
+    response headers, so long-lived streams do not skew it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=route.path if route is not None else "unmatched",
+                method=scope["method"],
+                status=str(status),
+            )
+
+        async def send_instrumented(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumented)
+        finally:
+            # Errors that escaped before any response become a 500
+            observe(500)
+            REQUESTS_IN_FLIGHT.dec()
+
+
+# Added last so it wraps the gzip and CORS middleware
+app.add_middleware(InstrumentMiddleware)
+
+LAYOUT_QUERY = Query(
+    "records",
+    enum=list(LAYOUTS),
+    description="records: list of {datetime, value}; columnar: {datetime: [...], value: [...]}",
+)
+TIMESTAMPS_QUERY = Query(
+    "iso", enum=list(TIMESTAMPS), description="iso: ISO-8601 strings; epoch: Unix seconds"
+)
+ZONE_PATH = Path(..., description="ElectricityMap zone code, e.g. PT or ES")
+
+
+async def _forecast_response(
+    request: Request, name, layout: str, timestamps: str, zone: str = REGION
+):
+    """Render one signal (or all of them when name is None) for a zone."""
+    if layout not in LAYOUTS or timestamps not in TIMESTAMPS:
+        raise HTTPException(status_code=422, detail="Unsupported layout or timestamps")
+    try:
+        zone = normalize_zone(zone)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        forecast, meta = await get_zone_forecast(zone)
+    except UpstreamDataError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # Upstream outages with no last good copy to serve are not internal errors
+    except CircuitOpenError as e:
+        retry_after = str(max(1, math.ceil(e.retry_after)))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after})
+    except ElectricityMapError as e:
+        raise HTTPException(status_code=504 if e.reason == "timeout" else 502, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    names = list(forecast) if name is None else [name]
+    payload = forecast if name is None else forecast[name]
+    if not all(forecast[n]["history"] for n in names):
+        raise HTTPException(status_code=503, detail=f"No upstream history for zone {zone}")
+    latest = max(forecast[n]["history"][-1]["datetime"] for n in names)
+    # The body only changes with the upstream values, the models or the representation;
+    # the digest also catches upstream revisions of an hour already served
+    etag = make_etag(
+        latest.isoformat(),
+        forecast_digest(forecast, names),
+        model_version(names, zone),
+        zone,
+        name,
+        layout,
+        timestamps,
+        meta["stale"],
+    )
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(latest),
+        "Cache-Control": f"max-age={max_age(meta['next_update'])}",
+        # Seconds since the forecast was computed, and the newest upstream hour it covers
+        "Age": str(int(meta["age"])),
+        "X-Data-Timestamp": latest.isoformat(),
+        "X-Stale": "true" if meta["stale"] else "false",
+    }
+    if not_modified(request.headers, etag, latest):
+        # The gzip middleware adds Vary to full bodies only; the gzip and
+        # identity bodies share the (weak) ETag this 304 validates
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    # The ETag covers the values and the representation, so it keys the rendered body
+    return render(payload, layout, timestamps, headers, cache_key=etag)
+
+
+@app.get("/healthz", summary="Liveness probe", tags=["Health"])
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz", summary="Readiness probe", tags=["Health"])
+async def readyz():
+    state = readiness()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "loading", **state})
+    return {"status": "ready", **state}
+
+
+@app.get("/metrics", summary="Prometheus metrics", tags=["Health"])
+async def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
 
 @app.get(
     "/api/renewable-percentage",
@@ -20,11 +216,10 @@ app.add_middleware(
     description="Fetches last 24h Renewable Percentage data, normalizes it, and returns history, scaled inputs, and a 0–5 prediction class.",
     tags=["Renewable Percentage"],
 )
-async def renewable_percentage():
-    try:
-        return get_renewable_percentage()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def renewable_percentage(
+    request: Request, layout: str = LAYOUT_QUERY, timestamps: str = TIMESTAMPS_QUERY
+):
+    return await _forecast_response(request, "renewable_percentage", layout, timestamps)
 
 
 @app.get(
@@ -33,11 +228,194 @@ async def renewable_percentage():
     description="Fetches last 24h Carbon Intensity data, normalizes it, and returns history, scaled inputs, and a 0–5 prediction class.",
     tags=["Carbon Intensity"],
 )
-async def carbon_intensity():
+async def carbon_intensity(
+    request: Request, layout: str = LAYOUT_QUERY, timestamps: str = TIMESTAMPS_QUERY
+):
+    return await _forecast_response(request, "carbon_intensity", layout, timestamps)
+
+
+@app.get(
+    "/api/forecast",
+    summary="⚡ Combined Forecast",
+    description="Fetches both 24h histories concurrently and returns the Carbon Intensity and Renewable Percentage forecasts in one payload.",
+    tags=["Forecast"],
+)
+async def forecast(
+    request: Request, layout: str = LAYOUT_QUERY, timestamps: str = TIMESTAMPS_QUERY
+):
+    return await _forecast_response(request, None, layout, timestamps)
+
+
+@app.get(
+    "/api/stream",
+    summary="📡 Forecast Stream",
+    description=(
+        "Server-Sent Events stream of the default zone's forecast. Sends the current "
+        "forecast on connect, then a `forecast` event with the newest history point and "
+        "prediction class of each signal whenever the upstream hour rolls over. Event ids "
+        "are the data timestamp, so reconnecting clients (Last-Event-ID) skip what they have."
+    ),
+    tags=["Forecast"],
+)
+async def stream(request: Request):
+    try:
+        events = forecast_stream(request.headers.get("last-event-id"))
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    headers = {
+        "Cache-Control": "no-cache",
+        # Keep reverse proxies (nginx) and the gzip middleware from buffering events
+        "X-Accel-Buffering": "no",
+        "Content-Encoding": "identity",
+    }
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+
+@app.get(
+    "/api/{zone}/renewable-percentage",
+    summary="🔋 Renewable Percentage Forecast by Zone",
+    description="Same as /api/renewable-percentage for any ElectricityMap zone. Zones without their own model use the default one.",
+    tags=["Renewable Percentage"],
+)
+async def zone_renewable_percentage(
+    request: Request,
+    zone: str = ZONE_PATH,
+    layout: str = LAYOUT_QUERY,
+    timestamps: str = TIMESTAMPS_QUERY,
+):
+    return await _forecast_response(request, "renewable_percentage", layout, timestamps, zone)
+
+
+@app.get(
+    "/api/{zone}/carbon-intensity",
+    summary="🌍 Carbon Intensity Forecast by Zone",
+    description="Same as /api/carbon-intensity for any ElectricityMap zone. Zones without their own model use the default one.",
+    tags=["Carbon Intensity"],
+)
+async def zone_carbon_intensity(
+    request: Request,
+    zone: str = ZONE_PATH,
+    layout: str = LAYOUT_QUERY,
+    timestamps: str = TIMESTAMPS_QUERY,
+):
+    return await _forecast_response(request, "carbon_intensity", layout, timestamps, zone)
+
+
+@app.get(
+    "/api/{zone}/forecast",
+    summary="⚡ Combined Forecast by Zone",
+    description="Same as /api/forecast for any ElectricityMap zone. Zones without their own model use the default one.",
+    tags=["Forecast"],
+)
+async def zone_forecast(
+    request: Request,
+    zone: str = ZONE_PATH,
+    layout: str = LAYOUT_QUERY,
+    timestamps: str = TIMESTAMPS_QUERY,
+):
+    return await _forecast_response(request, None, layout, timestamps, zone)
+
+
+@app.get(
+    "/api/predictions",
+    summary="🗂️ Prediction History",
+    description=(
+        "Forecasts the API has already computed, read from the prediction ledger without "
+        "recomputation. Filters on the data hour each forecast was made from: `from` is "
+        "inclusive, `to` exclusive. Each row has the class, softmax probabilities, scaled "
+        "inputs, input window hash and model version."
+    ),
+    tags=["Forecast"],
+)
+async def predictions(
+    start: Optional[datetime] = Query(None, alias="from", description="ISO-8601 start (inclusive)"),
+    end: Optional[datetime] = Query(None, alias="to", description="ISO-8601 end (exclusive)"),
+    zone: str = Query(REGION, description="ElectricityMap zone code"),
+    signal: Optional[str] = Query(None, description="carbon_intensity or renewable_percentage"),
+    limit: int = Query(1000, description="Maximum rows returned"),
+):
     try:
-        return get_carbon_intensity()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        zone = normalize_zone(zone)
+        rows = await query_predictions(zone, start, end, signal, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    body = dumps({"zone": zone, "count": len(rows), "predictions": rows})
+    return Response(content=body, media_type="application/json")
+
+
+@app.get(
+    "/api/history",
+    summary="🕰️ Stored History",
+    description=(
+        "Upstream history accumulated in the local time-series store, which keeps every "
+        "hour the API has fetched, so ranges can reach back past the upstream's 24 hours. "
+        "`from` is inclusive, `to` exclusive."
+    ),
+    tags=["Forecast"],
+)
+async def history(
+    signal: str = Query("carbon_intensity", description="carbon_intensity or renewable_percentage"),
+    start: Optional[datetime] = Query(None, alias="from", description="ISO-8601 start (inclusive)"),
+    end: Optional[datetime] = Query(None, alias="to", description="ISO-8601 end (exclusive)"),
+    zone: str = Query(REGION, description="ElectricityMap zone code"),
+    limit: int = Query(1000, description="Maximum rows returned"),
+):
+    try:
+        zone = normalize_zone(zone)
+        rows = await query_history(signal, zone, start, end, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    body = dumps({"zone": zone, "signal": signal, "count": len(rows), "history": rows})
+    return Response(content=body, media_type="application/json")
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    """The request body, or 413 as soon as it is known to exceed ``limit`` bytes."""
+    too_large = HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+@app.post(
+    "/api/predict/batch",
+    summary="📦 Batch Prediction",
+    description=(
+        "Classifies many raw 24-hour windows in one call. Send a JSON array of arrays "
+        "(24 values each), or a little-endian float32 body with Content-Type "
+        "application/octet-stream (24 values per window). Returns the 0–5 class and "
+        "softmax probabilities per window."
+    ),
+    tags=["Forecast"],
+)
+async def predict_batch(
+    request: Request,
+    signal: str = Query("carbon_intensity", description="carbon_intensity or renewable_percentage"),
+    zone: str = Query(REGION, description="Zone whose model and scaler are used"),
+):
+    body = await _read_body(request, BATCH_PREDICT_MAX_BYTES)
+    binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+    try:
+        zone = normalize_zone(zone)
+        # Decoding a large body takes a while; keep it off the event loop
+        windows = await asyncio.get_running_loop().run_in_executor(None, parse_windows, body, binary)
+        result = await predict_windows_async(signal, windows, zone)
+    except (TypeError, ValueError) as e:
+        # json.JSONDecodeError is a ValueError; NumPy raises TypeError for non-numbers
+        raise HTTPException(status_code=422, detail=str(e))
+    with STAGE_SECONDS.time(stage="serialize"):
+        body = dumps(result)
+    return Response(content=body, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+"""
+In-process metrics exported in the Prometheus text format (``GET /metrics``).
+
+A deliberately small subset of the Prometheus client: counters, gauges and
+histograms with labels, all safe to update from the inference threads.
+Gauges can also be backed by a function read at scrape time, so values
+that already live elsewhere (forecast age, breaker state) are not copied.
+"""
+import math
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond NumPy passes to multi-second upstream calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_metrics = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Settable gauge. With ``function``, values are read at scrape time instead:
+    a number for an unlabelled gauge, or a {label values tuple: number} dict.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is None:
+            yield from super().samples()
+            return
+        values = self.function()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _metrics) + "\n"
+
+
+# Shared service metrics; function-backed gauges are registered where their data lives
+REQUEST_SECONDS = Histogram(
+    "ci_rp_request_duration_seconds",
+    "HTTP request latency by route, method and status.",
+    ("route", "method", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "ci_rp_requests_in_flight", "HTTP requests currently being served."
+)
+STAGE_SECONDS = Histogram(
+    "ci_rp_stage_duration_seconds",
+    "Latency of each forecast pipeline stage: fetch, frame, scale, predict, serialize.",
+    ("stage",),
+)
+CACHE_REQUESTS = Counter(
+    "ci_rp_cache_requests_total",
+    "Cache lookups by cache and result (hit, stale or miss).",
+    ("cache", "result"),
+)
+UPSTREAM_ERRORS = Counter(
+    "ci_rp_upstream_errors_total",
+    "Failed ElectricityMap calls by endpoint and reason (HTTP status, timeout, transport, circuit_open).",
+    ("endpoint", "reason"),
+)
+
+
+def process_memory() -> dict:
+    """
+    This process's memory in bytes. On Linux, ``pss`` splits shared pages
+    between the processes that map them, so summing it over workers gives
+    the real footprint; ``shared`` is what copy-on-write sharing saved.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    name = fields[key]
+                    memory[name] = memory.get(name, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        # Peak RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["rss"] = peak if peak > 1 << 32 else peak * 1024
+    return memory
+
+
+PROCESS_MEMORY = Gauge(
+    "ci_rp_process_memory_bytes",
+    "Worker memory by kind (rss, pss, shared, private); pid tells workers apart.",
+    ("pid", "kind"),
+    function=lambda: {(str(os.getpid()), kind): value for kind, value in process_memory().items()},
+)
+
+
+def _hit_ratio() -> dict:
+    """Fresh hits over all lookups, per cache, from CACHE_REQUESTS."""
+    with CACHE_REQUESTS._lock:
+        items = list(CACHE_REQUESTS._values.items())
+    totals, hits = {}, {}
+    for (cache, result), count in items:
+        totals[cache] = totals.get(cache, 0) + count
+        if result == "hit":
+            hits[cache] = hits.get(cache, 0) + count
+    return {(cache,): hits.get(cache, 0) / total for cache, total in totals.items() if total}
+
+
+CACHE_HIT_RATIO = Gauge(
+    "ci_rp_cache_hit_ratio", "Fresh hits over all lookups, per cache.", ("cache",), function=_hit_ratio
+)
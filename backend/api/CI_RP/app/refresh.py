@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.cache import next_refresh
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastRefresher:
+    """
+    Background task that recomputes the forecast once per upstream update.
+
+    It runs ``compute`` at startup and then just after every period
+    boundary (plus ``grace``), keeping the ready-to-serve result in memory.
+    Request handlers only read ``snapshot``; if a refresh fails, or the
+    upstream has not published the new hour yet, the last good result keeps
+    being served and the refresh is retried every ``retry`` seconds (for
+    unchanged data, at most ``max_stale_retries`` times per period).
+    ``on_update`` is called with each snapshot that advanced to newer data.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[], Awaitable[dict]],
+        period: int = 3600,
+        grace: int = 120,
+        retry: int = 60,
+        max_stale_retries: int = 10,
+        on_stale: Optional[Callable[[], None]] = None,
+        on_update: Optional[Callable[[dict], None]] = None,
+    ):
+        self.compute = compute
+        self.period = period
+        self.grace = grace
+        self.retry = retry
+        self.max_stale_retries = max_stale_retries
+        # Called when a refresh returned no new data, before retrying
+        self.on_stale = on_stale
+        self.on_update = on_update
+        self.snapshot: Optional[dict] = None
+        self.updated_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the served snapshot was computed."""
+        return None if self.updated_at is None else time.time() - self.updated_at
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get(self) -> dict:
+        """Return the current snapshot, computing it first if none exists yet."""
+        if self.snapshot is None:
+            await self.refresh()
+        return self.snapshot
+
+    async def refresh(self) -> bool:
+        """Recompute the snapshot; True if it advanced to newer upstream data."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        try:
+            return await asyncio.shield(self._inflight)
+        finally:
+            if self._inflight is not None and self._inflight.done():
+                self._inflight = None
+
+    async def _refresh(self) -> bool:
+        try:
+            snapshot = await self.compute()
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        advanced = _latest(snapshot) != _latest(self.snapshot)
+        self.snapshot = snapshot
+        self.updated_at = time.time()
+        self.last_error = None
+        if advanced and self.on_update is not None:
+            try:
+                self.on_update(snapshot)
+            except Exception:
+                logger.exception("Forecast update hook failed")
+        return advanced
+
+    async def _run(self) -> None:
+        stale_retries = 0
+        while True:
+            try:
+                advanced = await self.refresh()
+            except Exception:
+                logger.exception("Forecast refresh failed; serving last good result")
+                await asyncio.sleep(self.retry)
+                continue
+            now = time.time()
+            delay = next_refresh(now, self.period, self.grace) - now
+            if not advanced and stale_retries < self.max_stale_retries:
+                # Upstream has not published the new hour yet; look again soon
+                stale_retries += 1
+                if self.on_stale is not None:
+                    self.on_stale()
+                delay = min(delay, self.retry)
+            else:
+                stale_retries = 0
+            await asyncio.sleep(delay)
+
+
+def _latest(snapshot: Optional[dict]):
+    """Newest history datetime across all signals in a snapshot."""
+    if not snapshot:
+        return None
+    return max(
+        (result["history"][-1]["datetime"] for result in snapshot.values() if result["history"]),
+        default=None,
+    )
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+def read_registry_file(path: Optional[str]) -> dict:
+    """
+    Load a zone -> signal -> {"model", "scaler"} mapping from JSON.
+
+    Relative artifact paths are resolved against the file's directory.
+    A missing or unset file yields an empty mapping (default models only).
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    return {
+        zone.upper(): {
+            signal: {kind: os.path.join(base, p) for kind, p in paths.items()}
+            for signal, paths in signals.items()
+        }
+        for zone, signals in raw.items()
+    }
+
+
+class ModelRegistry:
+    """
+    Maps (zone, signal) to model/scaler artifacts and keeps loaded ones in memory.
+
+    Zones without an entry (or without that signal) fall back to the default
+    artifacts. Loading is lazy and single-flight, and at most ``max_resident``
+    non-default artifact sets stay loaded: the least recently used one is
+    evicted (``on_evict`` is called with it) when a new one is loaded. The
+    default artifacts are never evicted.
+    """
+
+    def __init__(
+        self,
+        default: Dict[str, dict],
+        zones: Dict[str, Dict[str, dict]],
+        load: Callable[[dict], dict],
+        on_evict: Optional[Callable[[dict], None]] = None,
+        max_resident: int = 4,
+        executor=None,
+    ):
+        self.default = default
+        self.zones = zones
+        self.load = load
+        self.on_evict = on_evict
+        self.max_resident = max_resident
+        self.executor = executor
+        self._pinned: Dict[tuple, dict] = {}
+        self._resident: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._loading: Dict[tuple, asyncio.Task] = {}
+
+    def paths(self, zone: str, signal: str) -> dict:
+        return self.zones.get(zone.upper(), {}).get(signal, self.default[signal])
+
+    def _key(self, paths: dict) -> tuple:
+        return (os.path.abspath(paths["model"]), os.path.abspath(paths["scaler"]))
+
+    def _is_default(self, paths: dict) -> bool:
+        return any(self._key(paths) == self._key(p) for p in self.default.values())
+
+    def peek(self, zone: str, signal: str) -> Optional[dict]:
+        """Return the loaded artifacts without loading them."""
+        key = self._key(self.paths(zone, signal))
+        entry = self._pinned.get(key) or self._resident.get(key)
+        if entry is not None and key in self._resident:
+            self._resident.move_to_end(key)
+        return entry
+
+    def load_now(self, zone: str, signal: str) -> dict:
+        """Synchronously load (or return) the artifacts for a zone and signal."""
+        entry = self.peek(zone, signal)
+        if entry is None:
+            paths = self.paths(zone, signal)
+            entry = self._store(paths, self.load(paths))
+        return entry
+
+    async def get(self, zone: str, signal: str) -> dict:
+        """Return the artifacts for a zone and signal, loading them off the event loop if needed."""
+        entry = self.peek(zone, signal)
+        if entry is not None:
+            return entry
+        paths = self.paths(zone, signal)
+        key = self._key(paths)
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(paths))
+            self._loading[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, paths: dict) -> dict:
+        try:
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(self.executor, self.load, paths)
+            return self._store(paths, entry)
+        finally:
+            self._loading.pop(self._key(paths), None)
+
+    def _store(self, paths: dict, entry: dict) -> dict:
+        key = self._key(paths)
+        if self._is_default(paths):
+            self._pinned[key] = entry
+            return entry
+        self._resident[key] = entry
+        self._resident.move_to_end(key)
+        while len(self._resident) > self.max_resident:
+            _, evicted = self._resident.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+        return entry
+
+    def loaded(self) -> list:
+        return list(self._pinned.values()) + list(self._resident.values())
@@ -0,0 +1,77 @@
+import random
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open; ``retry_after`` is the cooldown left."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamDataError(Exception):
+    """Raised when the upstream returned too little history to forecast from."""
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker with exponential backoff and jitter.
+
+    After ``failure_threshold`` consecutive failures (errors or timeouts) the
+    circuit opens and calls fail fast with ``CircuitOpenError``. Once the
+    backoff delay has passed, one trial call is let through (half-open): a
+    success closes the circuit, a failure reopens it with twice the delay,
+    up to ``max_delay``. Delays are jittered so workers do not retry in step.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_delay: float = 5.0, max_delay: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.opens = 0
+        self.open_until = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opens = 0
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.failures >= self.failure_threshold:
+            delay = min(self.max_delay, self.base_delay * 2**self.opens)
+            # "Equal jitter": wait at least half the delay, at most all of it
+            self.open_until = time.monotonic() + delay / 2 + random.uniform(0, delay / 2)
+            self.opens += 1
+
+    async def call(self, fetch):
+        """Await ``fetch()`` through the breaker, recording the outcome."""
+        if not self.allow():
+            remaining = max(0.0, self.open_until - time.monotonic())
+            raise CircuitOpenError(f"circuit open for another {remaining:.0f}s", remaining)
+        try:
+            result = await fetch()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
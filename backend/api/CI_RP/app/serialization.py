@@ -0,0 +1,97 @@
+"""
+Response encoding for the forecast endpoints.
+
+Payloads are serialised with orjson when it is installed (falling back to
+the standard library), bypassing FastAPI's per-row ``jsonable_encoder``.
+Histories can be rendered as the default list of records or as columnar
+arrays, with ISO-8601 or epoch-second timestamps. Rendered bodies are
+memoised per ETag, which hashes the served values, so repeated polls only
+cost a dict lookup.
+"""
+import json
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from fastapi import Response
+
+from app.metrics import CACHE_REQUESTS, STAGE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+LAYOUTS = ("records", "columnar")
+TIMESTAMPS = ("iso", "epoch")
+
+# Rendered bodies, keyed by (cache key, layout, timestamps)
+_rendered = {}
+_RENDERED_MAX = 64
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def _timestamp(ts: datetime, timestamps: str):
+    return int(ts.timestamp()) if timestamps == "epoch" else ts.isoformat()
+
+
+def _history(history: list, layout: str, timestamps: str):
+    if layout == "columnar":
+        return {
+            "datetime": [_timestamp(row["datetime"], timestamps) for row in history],
+            "value": [row["value"] for row in history],
+        }
+    return [
+        {"datetime": _timestamp(row["datetime"], timestamps), "value": row["value"]}
+        for row in history
+    ]
+
+
+def shape(payload: dict, layout: str = "records", timestamps: str = "iso") -> dict:
+    """Convert every ``history`` in a signal result (or a dict of them) to the requested layout."""
+    if "history" in payload:
+        return {**payload, "history": _history(payload["history"], layout, timestamps)}
+    return {name: shape(result, layout, timestamps) for name, result in payload.items()}
+
+
+def render(
+    payload: dict,
+    layout: str = "records",
+    timestamps: str = "iso",
+    headers: Optional[dict] = None,
+    cache_key=None,
+) -> Response:
+    """
+    Encode ``payload`` into a JSON response.
+
+    When ``cache_key`` is given (e.g. the response's ETag), the encoded body
+    is reused for later calls with the same key, so the key must change
+    whenever the payload does.
+    """
+    key = None if cache_key is None else (cache_key, layout, timestamps)
+    body = _rendered.get(key) if key is not None else None
+    if key is not None:
+        CACHE_REQUESTS.inc(cache="render", result="hit" if body is not None else "miss")
+    if body is None:
+        with STAGE_SECONDS.time(stage="serialize"):
+            body = dumps(shape(payload, layout, timestamps))
+        if key is not None:
+            if len(_rendered) >= _RENDERED_MAX:
+                _rendered.clear()
+            _rendered[key] = body
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,17 +1,97 @@
 import os
-import requests
+import asyncio
+import gc
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Optional
+
 import pandas as pd
 import numpy as np
 import joblib
-import tensorflow as tf
 from dotenv import load_dotenv
+from electricitymap import (
+    AsyncElectricityMapClient,
+    AsyncIncrementalHistory,
+    Cassette,
+    ElectricityMapClient,
+    HistoryStore,
+    IncrementalHistory,
+)
+from electricitymap.lstm_numpy import NumpyModel
+
+from app.batching import MicroBatcher
+from app.broadcast import Broadcaster, SubscriberLimitError
+from app.cache import TTLCache, next_refresh
+from app.refresh import ForecastRefresher
+from app.registry import ModelRegistry, read_registry_file
+from app.resilience import CircuitBreaker, CircuitOpenError, UpstreamDataError
+from app.serialization import dumps
+from app.ledger import PredictionLedger
+from app.logs import log_event
+from app.metrics import CACHE_REQUESTS, STAGE_SECONDS, UPSTREAM_ERRORS, Gauge, process_memory
 
 load_dotenv()  # Load environment variables from .env file
 
+logger = logging.getLogger(__name__)
+
 # Load secrets from env
 API_KEY = os.getenv("ELECTRICITYMAP_API_KEY")
 BASE_URL = os.getenv("ELECTRICITYMAP_BASE_URL")
-REGION = os.getenv("ELECTRICITYMAP_REGION")
+REGION = os.getenv("ELECTRICITYMAP_REGION", "PT")
+
+# Upstream HTTP settings: seconds before giving up on ElectricityMap, retries
+# on timeouts / 429 / 5xx, and the size of the keep-alive pool shared by all
+# requests on this worker
+HTTP_TIMEOUT = float(os.getenv("ELECTRICITYMAP_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("ELECTRICITYMAP_RETRIES", "2"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("ELECTRICITYMAP_MAX_CONNECTIONS", "20"))
+# "incremental" downloads each history once, then polls only the /latest
+# point into a rolling buffer; "full" re-downloads the 24 h history each time
+INGEST_MODE = os.getenv("ELECTRICITYMAP_INGEST", "incremental")
+
+# ElectricityMap history advances hourly; cached histories expire at the next
+# hour plus a grace delay that covers the upstream publishing lag
+HISTORY_CACHE_PERIOD = int(os.getenv("HISTORY_CACHE_PERIOD", "3600"))
+HISTORY_CACHE_GRACE = int(os.getenv("HISTORY_CACHE_GRACE", "120"))
+
+# Circuit breaker per upstream endpoint: consecutive failures before opening,
+# and the initial / maximum backoff (seconds) before a trial call
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_BASE_DELAY = float(os.getenv("CIRCUIT_BASE_DELAY", "5"))
+CIRCUIT_MAX_DELAY = float(os.getenv("CIRCUIT_MAX_DELAY", "300"))
+
+# Seconds between retries when a background refresh fails or finds no new hour
+REFRESH_RETRY = int(os.getenv("REFRESH_RETRY", "60"))
+
+# Number of threads allowed to run model inference at the same time
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+# Micro-batching: how long a request may wait for others to share its
+# forward pass, and the largest batch run in one predict() call
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+
+# Largest number of windows accepted by the batch prediction endpoint, and
+# the number run per predict() call (bounds peak memory for big batches)
+BATCH_PREDICT_MAX_WINDOWS = int(os.getenv("BATCH_PREDICT_MAX_WINDOWS", "10000"))
+BATCH_PREDICT_CHUNK = int(os.getenv("BATCH_PREDICT_CHUNK", "1024"))
+# Largest request body accepted by the batch endpoint; the default allows
+# BATCH_PREDICT_MAX_WINDOWS JSON windows of up to 32 characters per value
+BATCH_PREDICT_MAX_BYTES = int(
+    os.getenv("BATCH_PREDICT_MAX_BYTES", str(BATCH_PREDICT_MAX_WINDOWS * 24 * 32))
+)
+
+# Responses larger than this many bytes are gzip-compressed when accepted
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# "numpy" serves the exported .npz weights without TensorFlow; "keras" loads
+# the original .keras files (requires tensorflow to be installed)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "numpy")
 
 # Paths to your saved models & scalers (mount these into container)
 SCALER_RP_PATH = os.getenv(
@@ -27,46 +107,711 @@ MODEL_CI_PATH = os.getenv(
     "MODEL_CI_PATH", "./models/carbon_intensity/model_carbon_intensity.keras"
 )
 
-# Load scalers and models once
-_scaler_rp = joblib.load(SCALER_RP_PATH)
-_scaler_ci = joblib.load(SCALER_CI_PATH)
-_model_rp = tf.keras.models.load_model(MODEL_RP_PATH)
-_model_ci = tf.keras.models.load_model(MODEL_CI_PATH)
-
-
-def _fetch_history(endpoint: str, field: str) -> pd.DataFrame:
-    print(BASE_URL)
-    print(REGION)
-    print(API_KEY)
-    url = f"{BASE_URL}/{endpoint}?zone={REGION}"
-    headers = {"auth-token": API_KEY}
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    data = resp.json()["history"]
-    df = pd.DataFrame(data)
-    df["datetime"] = pd.to_datetime(df["datetime"])
-    df = df.sort_values("datetime").tail(24)
-    df = df[["datetime", field]].rename(columns={field: "value"})
+# Optional JSON mapping of zone -> signal -> {"model", "scaler"}; zones that
+# are not listed use the default models above
+MODEL_REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH", "./models/registry.json")
+# Non-default model sets kept loaded at once (least recently used is evicted)
+MODEL_MAX_RESIDENT = int(os.getenv("MODEL_MAX_RESIDENT", "4"))
+# Append-only SQLite ledger of every computed forecast ("" disables it)
+PREDICTION_LEDGER_PATH = os.getenv("PREDICTION_LEDGER_PATH", "./data/predictions.sqlite3")
+# Max rows returned by GET /api/predictions
+PREDICTION_QUERY_LIMIT = int(os.getenv("PREDICTION_QUERY_LIMIT", "10000"))
+# Local time-series store accumulating every fetched history row beyond the
+# upstream's 24 h window ("" disables it); max rows per GET /api/history
+HISTORY_STORE_PATH = os.getenv("HISTORY_STORE_PATH", "./data/history.sqlite3")
+HISTORY_QUERY_LIMIT = int(os.getenv("HISTORY_QUERY_LIMIT", "10000"))
+# Forecast stream (SSE): max open streams per worker, seconds between keep-alives
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "1000"))
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+# "1" loads the default models at import time, so a preloading server
+# (gunicorn --preload, see gunicorn.conf.py) shares them copy-on-write
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "0") == "1"
+# Load the default models concurrently at startup ("0" loads them one by one)
+MODEL_PARALLEL_LOAD = os.getenv("MODEL_PARALLEL_LOAD", "1") == "1"
+# Seconds before retrying a failed startup load, doubling up to the maximum
+MODEL_LOAD_RETRY = float(os.getenv("MODEL_LOAD_RETRY", "1"))
+MODEL_LOAD_RETRY_MAX = float(os.getenv("MODEL_LOAD_RETRY_MAX", "60"))
+
+# ElectricityMap zone codes, e.g. PT, ES, FR, DK-DK1, US-CAL-CISO
+ZONE_PATTERN = re.compile(r"^[A-Z]{2}(-[A-Z0-9]+)*$")
+
+
+@lru_cache(maxsize=None)
+def _model_version(path: str) -> str:
+    """Short content hash of the served model file, used in ETags."""
+    if MODEL_BACKEND != "keras":
+        path = os.path.splitext(path)[0] + ".npz"
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def _load_model(path: str):
+    if MODEL_BACKEND == "keras":
+        import tensorflow as tf
+
+        return tf.keras.models.load_model(path)
+    npz_path = os.path.splitext(path)[0] + ".npz"
+    if not os.path.exists(npz_path):
+        raise FileNotFoundError(
+            f"{npz_path} not found; run `python -m app.export_weights {path}`"
+        )
+    return NumpyModel.load(npz_path)
+
+
+# Bounded pool that keeps the CPU-bound predict() calls off the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+)
+_http_client: Optional[AsyncElectricityMapClient] = None
+_sync_client: Optional[ElectricityMapClient] = None
+# Rolling histories per (upstream signal, zone) in incremental mode
+_feeds = {}
+_sync_feeds = {}
+_history_store = HistoryStore(HISTORY_STORE_PATH) if HISTORY_STORE_PATH else None
+# Store reads and writes get their own thread, so disk I/O never holds up inference
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-store")
+_history_cache = TTLCache(period=HISTORY_CACHE_PERIOD, grace=HISTORY_CACHE_GRACE)
+_breakers = {}
+
+
+def _breaker(endpoint: str) -> CircuitBreaker:
+    if endpoint not in _breakers:
+        _breakers[endpoint] = CircuitBreaker(
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            base_delay=CIRCUIT_BASE_DELAY,
+            max_delay=CIRCUIT_MAX_DELAY,
+        )
+    return _breakers[endpoint]
+
+
+def _on_upstream_call(stats) -> None:
+    """Per-call metrics and sampled logs for every ElectricityMap request."""
+    if stats.error is None:
+        STAGE_SECONDS.observe(stats.duration, stage="fetch")
+        # Never log the API key itself, only whether one is configured
+        log_event(
+            "upstream_fetch",
+            base_url=BASE_URL,
+            endpoint=stats.endpoint,
+            zone=stats.zone,
+            auth=bool(API_KEY),
+            bytes=stats.bytes,
+            attempts=stats.attempts,
+            duration_ms=round(stats.duration * 1000, 1),
+        )
+        return
+    reason = str(stats.status) if stats.error == "http" else stats.error
+    _upstream_error(stats.endpoint, stats.zone, reason, stats.duration, stats.attempts)
+
+
+def _upstream_error(endpoint: str, zone: str, reason: str, elapsed: float, attempts: int = 0) -> None:
+    UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=reason)
+    log_event(
+        "upstream_error",
+        logging.WARNING,
+        endpoint=endpoint,
+        zone=zone,
+        reason=reason,
+        attempts=attempts,
+        duration_ms=round(elapsed * 1000, 1),
+    )
+
+
+def _client_settings() -> dict:
+    return {
+        "api_key": API_KEY,
+        "base_url": BASE_URL,
+        "timeout": HTTP_TIMEOUT,
+        "retries": HTTP_RETRIES,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "on_call": _on_upstream_call,
+        # ELECTRICITYMAP_REPLAY=record|replay (see the README)
+        "cassette": Cassette.from_env(),
+    }
+
+
+async def start_http_client() -> None:
+    """Open the pooled async client used for ElectricityMap calls."""
+    global _http_client
+    if _http_client is None:
+        _http_client = AsyncElectricityMapClient(**_client_settings())
+
+
+async def close_http_client() -> None:
+    """Close the pooled client and release its connections."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        # Feeds hold the closed client; they reseed from a new one on demand
+        _feeds.clear()
+
+
+def _history_frame(records, field: str) -> pd.DataFrame:
+    """Last 24 hours of one record attribute; records arrive typed and sorted."""
+    if len(records) < 24:
+        raise UpstreamDataError(f"Upstream returned {len(records)} history rows, need 24")
+    with STAGE_SECONDS.time(stage="frame"):
+        records = records[-24:]
+        df = pd.DataFrame(
+            {
+                "datetime": pd.to_datetime([r.datetime for r in records], utc=True),
+                "value": [getattr(r, field) for r in records],
+            }
+        )
     return df
 
 
-def get_renewable_percentage() -> dict:
-    df = _fetch_history("power-breakdown/history", "renewablePercentage")
-    raw = df.to_dict(orient="records")
+def normalize_zone(zone: str) -> str:
+    zone = zone.upper()
+    if not ZONE_PATTERN.match(zone):
+        raise ValueError(f"Invalid zone {zone!r}")
+    return zone
+
+
+def _fetch_history(upstream: str, field: str, zone: str = REGION) -> pd.DataFrame:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = ElectricityMapClient(**_client_settings())
+    if INGEST_MODE != "incremental":
+        history = _sync_client.history(upstream, zone)
+        records, rows = history.records, history.raw.get("history", [])
+    else:
+        feed = _sync_feeds.get((upstream, zone))
+        if feed is None:
+            feed = _sync_feeds[(upstream, zone)] = IncrementalHistory(_sync_client, upstream, zone)
+        records, rows = feed.refresh(), feed.buffer.rows()
+    if _history_store is not None:
+        _history_store.append(upstream, zone, rows)
+    return _history_frame(records, field)
+
+
+async def _download_history(upstream: str, zone: str) -> tuple:
+    history = await _http_client.history(upstream, zone)
+    return history.records, history.raw.get("history", [])
+
+
+async def _refresh_feed(feed: AsyncIncrementalHistory) -> tuple:
+    return await feed.refresh(), feed.buffer.rows()
+
+
+def _store_done(future) -> None:
+    if future.exception() is not None:
+        logger.error("Writing to the history store failed", exc_info=future.exception())
+
+
+def _store_history(upstream: str, zone: str, rows: list) -> None:
+    """Append fetched rows to the local store off the event loop (idempotent upsert)."""
+    if _history_store is None or not rows:
+        return
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(_store_executor, _history_store.append, upstream, zone, rows).add_done_callback(
+        _store_done
+    )
+
+
+async def _fetch_upstream(upstream: str, zone: str) -> tuple:
+    """Update one history through the endpoint's circuit breaker."""
+    if _http_client is None:
+        await start_http_client()
+    endpoint = f"{upstream}/history"
+    if INGEST_MODE == "incremental":
+        feed = _feeds.get((upstream, zone))
+        if feed is None:
+            feed = _feeds[(upstream, zone)] = AsyncIncrementalHistory(_http_client, upstream, zone)
+        fetch = lambda: _refresh_feed(feed)  # noqa: E731
+    else:
+        fetch = lambda: _download_history(upstream, zone)  # noqa: E731
+    try:
+        records, rows = await _breaker(endpoint).call(fetch)
+    except CircuitOpenError:
+        _upstream_error(endpoint, zone, "circuit_open", 0.0)
+        raise
+    _store_history(upstream, zone, rows)
+    return tuple(records)
+
+
+async def _fetch_history_async(
+    upstream: str, field: str, zone: str = REGION, wait: bool = False
+):
+    """
+    Return (history frame, stale); stale means the last good copy was served.
+
+    Request handlers get an expired copy at once while it is revalidated in
+    the background. ``wait=True`` (the background refresher) waits for the
+    new data instead and only falls back to the old copy if the fetch fails.
+    """
+    key = (upstream, zone)
+    value, fresh = _history_cache.lookup(key)
+    CACHE_REQUESTS.inc(
+        cache="history", result="hit" if fresh else "stale" if value is not None else "miss"
+    )
+    lookup = _history_cache.get_or_refresh if wait else _history_cache.get_or_revalidate
+    records, stale = await lookup(key, lambda: _fetch_upstream(upstream, zone))
+    return _history_frame(records, field), stale
+
+
+# Every forecast signal served by the API: upstream signal and the record
+# attribute it forecasts. Models and scalers come from the registry below, per zone.
+SIGNALS = {
+    "carbon_intensity": {
+        "upstream": "carbon-intensity",
+        "field": "carbon_intensity",
+    },
+    "renewable_percentage": {
+        "upstream": "power-breakdown",
+        "field": "renewable_percentage",
+    },
+}
+
+
+def _timed_predict(model, x: np.ndarray) -> np.ndarray:
+    with STAGE_SECONDS.time(stage="predict"):
+        return model.predict(x, verbose=0)
+
+
+def _load_artifacts(paths: dict) -> dict:
+    model = _load_model(paths["model"])
+    return {
+        "scaler": joblib.load(paths["scaler"]),
+        "model": model,
+        "version": _model_version(paths["model"]),
+        # Concurrent requests for the same model share a forward pass
+        "batcher": MicroBatcher(
+            lambda x: _timed_predict(model, x),
+            executor=_executor,
+            max_batch=BATCH_MAX_SIZE,
+            max_wait=BATCH_MAX_WAIT_MS / 1000,
+        ),
+    }
+
+
+_registry = ModelRegistry(
+    default={
+        "carbon_intensity": {"model": MODEL_CI_PATH, "scaler": SCALER_CI_PATH},
+        "renewable_percentage": {"model": MODEL_RP_PATH, "scaler": SCALER_RP_PATH},
+    },
+    zones=read_registry_file(MODEL_REGISTRY_PATH),
+    load=_load_artifacts,
+    on_evict=lambda entry: entry["batcher"].close(),
+    max_resident=MODEL_MAX_RESIDENT,
+    executor=_executor,
+)
+
+_readiness = {"ready": False, "error": None}
+
+
+def _warm_up(entry: dict) -> None:
+    # A dummy forward pass pays one-off costs (allocation, graph tracing) up front
+    entry["scaler"].transform(np.zeros((24, 1)))
+    entry["model"].predict(np.zeros((1, 24, 1), dtype=np.float32), verbose=0)
+
+
+async def _load_defaults(parallel: bool) -> None:
+    if parallel:
+        entries = await asyncio.gather(*(_registry.get(REGION, name) for name in SIGNALS))
+    else:
+        entries = [await _registry.get(REGION, name) for name in SIGNALS]
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(_executor, _warm_up, entry) for entry in entries))
+
+
+async def load_registry(parallel: bool = MODEL_PARALLEL_LOAD) -> None:
+    """
+    Load and warm the default models; called from the app lifespan, off the
+    import path. A failed load (e.g. a model volume mounted late) is retried
+    with exponential backoff until it succeeds or the task is cancelled.
+    """
+    delay = MODEL_LOAD_RETRY
+    while True:
+        try:
+            await _load_defaults(parallel)
+            break
+        except Exception as e:
+            _readiness["error"] = str(e)
+            logger.exception("Loading the default models failed; retrying in %.0fs", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MODEL_LOAD_RETRY_MAX)
+    _readiness["ready"] = True
+    _readiness["error"] = None
+    log_event("worker_ready", sample=1, pid=os.getpid(), **process_memory())
+
+
+def preload_models() -> None:
+    """
+    Load and warm the default models synchronously, before any worker forks.
+
+    With the NumPy backend nothing here starts a thread, event loop or
+    connection (executors, batchers, HTTP clients and the ledger all start
+    lazily in the worker), so forking afterwards is safe. ``gc.freeze``
+    moves the loaded objects out of the collector's view; otherwise each
+    worker's first collection would write to every page it scans and
+    un-share it. TensorFlow starts its thread pools when it loads a model,
+    and those do not survive a fork, so with ``MODEL_BACKEND=keras`` this
+    does nothing and each worker loads its own models in the lifespan.
+    """
+    if MODEL_BACKEND == "keras":
+        logger.warning("MODEL_PRELOAD is ignored with MODEL_BACKEND=keras (not fork-safe)")
+        return
+    for name in SIGNALS:
+        _warm_up(_registry.load_now(REGION, name))
+    gc.freeze()
+
+
+def readiness() -> dict:
+    """Whether the default models are loaded and warmed, plus what is resident."""
+    return {
+        **_readiness,
+        "models_loaded": len(_registry.loaded()),
+        "pid": os.getpid(),
+        "memory": process_memory(),
+    }
+
+
+if MODEL_PRELOAD:
+    preload_models()
+
+
+async def close_registry() -> None:
+    """Stop the micro-batchers of every loaded model."""
+    for entry in _registry.loaded():
+        await entry["batcher"].stop()
+
+
+_ledger = PredictionLedger(PREDICTION_LEDGER_PATH) if PREDICTION_LEDGER_PATH else None
+
+
+def _ledger_done(future) -> None:
+    if future.exception() is not None:
+        logger.error("Writing to the prediction ledger failed", exc_info=future.exception())
+
+
+def _record_prediction(
+    name: str, zone: str, df: pd.DataFrame, scaled: list, preds, version: str, stale: bool
+) -> None:
+    if _ledger is None or df.empty:
+        return
+    _ledger.record(
+        zone,
+        name,
+        df["datetime"].iloc[-1],
+        df["value"].values,
+        scaled,
+        preds,
+        int(np.argmax(preds)),
+        version,
+        stale,
+    ).add_done_callback(_ledger_done)
+
+
+async def query_predictions(
+    zone: str = REGION, start=None, end=None, signal: Optional[str] = None, limit: int = 1000
+) -> list:
+    """Stored forecasts for a zone whose data hour is in [start, end), oldest first."""
+    if _ledger is None:
+        raise RuntimeError("Prediction ledger is disabled (PREDICTION_LEDGER_PATH is empty)")
+    if signal is not None and signal not in SIGNALS:
+        raise ValueError(f"Unknown signal {signal!r}; expected one of {sorted(SIGNALS)}")
+    if not 0 < limit <= PREDICTION_QUERY_LIMIT:
+        raise ValueError(f"limit must be between 1 and {PREDICTION_QUERY_LIMIT}")
+    return await asyncio.wrap_future(_ledger.query(zone, start, end, signal, limit))
+
+
+def close_ledger() -> None:
+    """Flush pending ledger writes and close the database."""
+    if _ledger is not None:
+        _ledger.close()
+
+
+async def query_history(
+    name: str, zone: str = REGION, start=None, end=None, limit: int = 1000
+) -> list:
+    """Stored upstream history for one signal and zone in [start, end), oldest first."""
+    if _history_store is None:
+        raise RuntimeError("History store is disabled (HISTORY_STORE_PATH is empty)")
+    if name not in SIGNALS:
+        raise ValueError(f"Unknown signal {name!r}; expected one of {sorted(SIGNALS)}")
+    if not 0 < limit <= HISTORY_QUERY_LIMIT:
+        raise ValueError(f"limit must be between 1 and {HISTORY_QUERY_LIMIT}")
+    upstream, field = SIGNALS[name]["upstream"], SIGNALS[name]["field"]
+    loop = asyncio.get_running_loop()
+    records = await loop.run_in_executor(
+        _store_executor, _history_store.records, upstream, zone, start, end, limit
+    )
+    return [
+        {
+            "datetime": r.datetime.isoformat(),
+            "value": getattr(r, field),
+            "is_estimated": r.is_estimated,
+        }
+        for r in records
+    ]
+
+
+def close_history_store() -> None:
+    """Finish pending history writes and close the store."""
+    # The single store thread runs tasks in order: this waits for earlier writes
+    _store_executor.submit(lambda: None).result()
+    if _history_store is not None:
+        _history_store.close()
+
+
+def _scale(df: pd.DataFrame, scaler) -> list:
     values = df["value"].values.reshape(-1, 1)
-    scaled = _scaler_rp.transform(values).flatten().tolist()
+    with STAGE_SECONDS.time(stage="scale"):
+        return scaler.transform(values).flatten().tolist()
+
+
+def _response(df: pd.DataFrame, scaled: list, preds: np.ndarray, stale: bool = False) -> dict:
+    cls = int(np.argmax(preds))
+    return {
+        "history": df.to_dict(orient="records"),
+        "scaled_history": scaled,
+        "prediction_class": cls,
+        "stale": stale,
+    }
+
+
+def _predict(name: str, zone: str, df: pd.DataFrame, entry: dict) -> dict:
+    scaled = _scale(df, entry["scaler"])
     inp = np.array(scaled).reshape(1, 24, 1)
-    preds = _model_rp.predict(inp)
-    cls = int(np.argmax(preds, axis=1)[0])
-    return {"history": raw, "scaled_history": scaled, "prediction_class": cls}
+    preds = _timed_predict(entry["model"], inp)[0]
+    _record_prediction(name, zone, df, scaled, preds, entry["version"], False)
+    return _response(df, scaled, preds)
+
+
+def get_forecast(names=tuple(SIGNALS), zone: str = REGION) -> dict:
+    result = {}
+    for name in names:
+        df = _fetch_history(SIGNALS[name]["upstream"], SIGNALS[name]["field"], zone)
+        entry = _registry.load_now(zone, name)
+        result[name] = _predict(name, zone, df, entry)
+    return result
+
+
+async def _forecast_signal(name: str, zone: str, wait: bool = False) -> dict:
+    signal = SIGNALS[name]
+    (df, stale), entry = await asyncio.gather(
+        _fetch_history_async(signal["upstream"], signal["field"], zone, wait),
+        _registry.get(zone, name),
+    )
+    scaled = _scale(df, entry["scaler"])
+    window = np.array(scaled, dtype=np.float32).reshape(24, 1)
+    preds = await entry["batcher"].submit(window)
+    _record_prediction(name, zone, df, scaled, preds, entry["version"], stale)
+    return _response(df, scaled, preds, stale)
+
+
+async def get_forecast_async(
+    names=tuple(SIGNALS), zone: str = REGION, wait: bool = False
+) -> dict:
+    """
+    Fetch the histories concurrently and run each model through its
+    micro-batcher. ``wait`` waits for expired histories to reload (see
+    ``_fetch_history_async``).
+    """
+    results = await asyncio.gather(*(_forecast_signal(name, zone, wait) for name in names))
+    return dict(zip(names, results))
+
+
+def _predict_windows(name: str, entry: dict, windows: np.ndarray) -> dict:
+    # One vectorised scaler call for the whole batch
+    with STAGE_SECONDS.time(stage="scale"):
+        scaled = entry["scaler"].transform(windows.reshape(-1, 1)).reshape(-1, 24, 1)
+    probs = np.concatenate(
+        [
+            _timed_predict(entry["model"], scaled[i : i + BATCH_PREDICT_CHUNK])
+            for i in range(0, len(scaled), BATCH_PREDICT_CHUNK)
+        ]
+    )
+    return {
+        "signal": name,
+        "classes": probs.argmax(axis=1),
+        "probabilities": probs,
+    }
+
+
+def parse_windows(body: bytes, binary: bool) -> np.ndarray:
+    """Decode a batch body: little-endian float32 (``binary``) or a JSON array of arrays."""
+    if binary:
+        if len(body) % (24 * 4):
+            raise ValueError("Binary body must hold a whole number of 24 x float32 windows")
+        return np.frombuffer(body, dtype="<f4").reshape(-1, 24)
+    rows = json.loads(body)
+    if not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+        raise ValueError("JSON body must be an array of 24-value arrays")
+    return np.asarray(rows, dtype=np.float64)
+
+
+async def predict_windows_async(name: str, windows: np.ndarray, zone: str = REGION) -> dict:
+    """Classify raw (unscaled) 24-value windows of shape (n, 24) for one signal."""
+    if name not in SIGNALS:
+        raise ValueError(f"Unknown signal {name!r}; expected one of {sorted(SIGNALS)}")
+    if windows.ndim != 2 or windows.shape[1] != 24:
+        raise ValueError(f"Expected windows of shape (n, 24), got {windows.shape}")
+    if not 0 < len(windows) <= BATCH_PREDICT_MAX_WINDOWS:
+        raise ValueError(f"Expected 1 to {BATCH_PREDICT_MAX_WINDOWS} windows, got {len(windows)}")
+    if not np.isfinite(windows).all():
+        raise ValueError("Windows must contain only finite values")
+    entry = await _registry.get(zone, name)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _predict_windows, name, entry, windows)
+
+
+def get_renewable_percentage() -> dict:
+    return get_forecast(["renewable_percentage"])["renewable_percentage"]
 
 
 def get_carbon_intensity() -> dict:
-    df = _fetch_history("carbon-intensity/history", "carbonIntensity")
-    raw = df.to_dict(orient="records")
-    values = df["value"].values.reshape(-1, 1)
-    scaled = _scaler_ci.transform(values).flatten().tolist()
-    inp = np.array(scaled).reshape(1, 24, 1)
-    preds = _model_ci.predict(inp)
-    cls = int(np.argmax(preds, axis=1)[0])
-    return {"history": raw, "scaled_history": scaled, "prediction_class": cls}
+    return get_forecast(["carbon_intensity"])["carbon_intensity"]
+
+
+async def get_renewable_percentage_async() -> dict:
+    forecast = await get_forecast_async(["renewable_percentage"])
+    return forecast["renewable_percentage"]
+
+
+async def get_carbon_intensity_async() -> dict:
+    forecast = await get_forecast_async(["carbon_intensity"])
+    return forecast["carbon_intensity"]
+
+
+# Open forecast streams; every new upstream hour is pushed to all of them
+_broadcaster = Broadcaster(max_subscribers=STREAM_MAX_SUBSCRIBERS, keepalive=STREAM_KEEPALIVE)
+
+
+def _publish_forecast(snapshot: dict) -> None:
+    """Push the newest history point and prediction class of each signal to the streams."""
+    signals = {
+        name: {
+            "datetime": result["history"][-1]["datetime"].isoformat(),
+            "value": result["history"][-1]["value"],
+            "prediction_class": result["prediction_class"],
+            "stale": result["stale"],
+        }
+        for name, result in snapshot.items()
+        if result["history"]
+    }
+    latest = max((signal["datetime"] for signal in signals.values()), default=None)
+    event = {"zone": REGION, "datetime": latest, "signals": signals}
+    _broadcaster.publish(dumps(event), event="forecast", event_id=latest)
+
+
+# Precomputed forecast for every signal, refreshed hourly in the background
+_refresher = ForecastRefresher(
+    # Wakes when the cached histories expire, so it must wait for the new hour
+    partial(get_forecast_async, wait=True),
+    period=HISTORY_CACHE_PERIOD,
+    grace=HISTORY_CACHE_GRACE,
+    retry=REFRESH_RETRY,
+    on_stale=_history_cache.expire,
+    on_update=_publish_forecast,
+)
+
+
+def forecast_stream(last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events for the default zone: the current forecast, then one
+    event per new upstream hour. Raises SubscriberLimitError when full.
+    """
+    if _broadcaster.full:
+        raise SubscriberLimitError(f"{_broadcaster.max_subscribers} streams already open")
+    return _broadcaster.stream(last_event_id)
+
+
+Gauge(
+    "ci_rp_forecast_age_seconds",
+    "Seconds since the served default-zone forecast was computed.",
+    function=lambda: _refresher.age,
+)
+Gauge(
+    "ci_rp_circuit_open",
+    "1 while an upstream endpoint's circuit breaker is open (failing fast).",
+    ("endpoint",),
+    function=lambda: {
+        (endpoint,): int(breaker.state == "open") for endpoint, breaker in _breakers.items()
+    },
+)
+Gauge(
+    "ci_rp_stream_subscribers",
+    "Open forecast streams (Server-Sent Events) on this worker.",
+    function=lambda: _broadcaster.subscribers,
+)
+Gauge(
+    "ci_rp_models_loaded",
+    "Model/scaler sets currently held in memory.",
+    function=lambda: len(_registry.loaded()),
+)
+
+
+async def start_refresher() -> None:
+    _refresher.start()
+
+
+async def stop_refresher() -> None:
+    await _refresher.stop()
+
+
+async def get_cached_forecast() -> dict:
+    """Ready-to-serve forecast for all signals, as of the last successful refresh."""
+    return await _refresher.get()
+
+
+def forecast_age() -> Optional[float]:
+    return _refresher.age
+
+
+def model_version(names=tuple(SIGNALS), zone: str = REGION) -> str:
+    return "+".join(_model_version(_registry.paths(zone, name)["model"]) for name in names)
+
+
+def forecast_digest(forecast: dict, names=tuple(SIGNALS)) -> str:
+    """Short hash of the served values; upstream revisions of an hour change it."""
+    digest = hashlib.sha256()
+    for name in names:
+        result = forecast[name]
+        digest.update(
+            dumps([name, result["history"], result["prediction_class"], result["stale"]])
+        )
+    return digest.hexdigest()[:16]
+
+
+def next_forecast_update() -> float:
+    """Epoch seconds when the background refresher next expects new data."""
+    if forecast_is_stale():
+        return time.time() + REFRESH_RETRY
+    return next_refresh(time.time(), HISTORY_CACHE_PERIOD, HISTORY_CACHE_GRACE)
+
+
+def forecast_is_stale() -> bool:
+    """True if the served forecast came from last good data or the last refresh failed."""
+    snapshot = _refresher.snapshot or {}
+    return _refresher.last_error is not None or any(
+        result["stale"] for result in snapshot.values()
+    )
+
+
+async def get_zone_forecast(zone: str = REGION):
+    """
+    Return (forecast, meta) for a zone. The default zone is served from the
+    background refresher; other zones are computed on demand from the
+    cached upstream history and their registry models.
+    """
+    if zone == REGION:
+        forecast = await get_cached_forecast()
+        meta = {
+            "age": forecast_age() or 0,
+            "stale": forecast_is_stale(),
+            "next_update": next_forecast_update(),
+        }
+        return forecast, meta
+    forecast = await get_forecast_async(zone=zone)
+    stale = any(result["stale"] for result in forecast.values())
+    meta = {
+        "age": 0,
+        "stale": stale,
+        "next_update": time.time() + REFRESH_RETRY
+        if stale
+        else next_refresh(time.time(), HISTORY_CACHE_PERIOD, HISTORY_CACHE_GRACE),
+    }
+    return forecast, meta
@@ -0,0 +1,30 @@
+# Multi-worker deployment with models shared between workers.
+#
+#   pip install ".[gunicorn]"
+#   gunicorn -c gunicorn.conf.py app.main:app
+#
+# The app (and, with MODEL_PRELOAD=1, the default models) is imported once in
+# the master process; forked workers share those pages copy-on-write instead
+# of each holding a private copy. Compare workers' ci_rp_process_memory_bytes
+# (pss vs rss) on /metrics, or the "memory" block of /readyz.
+#
+# Only the NumPy backend is preloaded. With MODEL_BACKEND=keras, TensorFlow
+# would start thread pools in the master that forked workers cannot use, so
+# each worker loads its own copy after the fork instead (no sharing).
+import gc
+import os
+
+os.environ.setdefault("MODEL_PRELOAD", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# First load can be slow on cold disks
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def pre_fork(server, worker):
+    # Also freeze what was imported after the models, so workers' garbage
+    # collections do not touch (and un-share) the master's objects
+    gc.freeze()
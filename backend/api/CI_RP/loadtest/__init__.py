@@ -0,0 +1 @@
+"""Offline load-testing tools for the CI_RP API (stub upstream + load generator)."""
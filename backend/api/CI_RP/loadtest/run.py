@@ -0,0 +1,299 @@
+"""
+Load-test the CI_RP API against the stub ElectricityMap server, fully offline.
+
+Starts ``loadtest.stub``, launches uvicorn with ``ELECTRICITYMAP_BASE_URL``
+pointing at it, waits for ``/readyz`` and then drives the routes with a
+fixed number of concurrent clients. Throughput, p50/p95/p99 latency per
+route, status codes, upstream calls and the API's own per-stage timings
+(from ``/metrics``) are written as a JSON report plus a Markdown summary.
+Pass ``--baseline`` with an earlier JSON report to add deltas.
+
+Usage (from backend/api/CI_RP):
+    python -m loadtest.run --requests 5000 --concurrency 32 --stub-latency-ms 80
+    python -m loadtest.run --duration 30 --baseline reports/loadtest-v1.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from loadtest.stub import StubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROUTES = ["/api/forecast", "/api/carbon-intensity", "/api/renewable-percentage"]
+PERCENTILES = (50, 95, 99)
+STAGE_PATTERN = re.compile(r'^ci_rp_stage_duration_seconds_(sum|count)\{stage="(\w+)"\} (\S+)$')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_api(port: int, upstream_url: str, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "ELECTRICITYMAP_BASE_URL": upstream_url,
+        "ELECTRICITYMAP_API_KEY": os.getenv("ELECTRICITYMAP_API_KEY", "loadtest"),
+        "LOG_SAMPLE_RATE": "0",
+        # No SQLite files under ./data, and no ledger or store disk I/O in the timings
+        "HISTORY_STORE_PATH": "",
+        "PREDICTION_LEDGER_PATH": "",
+    }
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"API not ready after {timeout:.0f}s")
+
+
+async def _drive(client, routes, concurrency, total, duration):
+    """Run the load; returns (per-request samples, wall-clock seconds)."""
+    samples = []
+    issued = 0
+    stop_at = None if duration is None else time.perf_counter() + duration
+
+    async def worker():
+        nonlocal issued
+        while True:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return
+            if stop_at is None and issued >= total:
+                return
+            route = routes[issued % len(routes)]
+            issued += 1
+            start = time.perf_counter()
+            try:
+                status = (await client.get(route)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples.append((route, status, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def _summary(latencies: list, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(float(ms.mean()), 2) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 2) if len(ms) else None,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = round(float(np.percentile(ms, p)), 2) if len(ms) else None
+    return summary
+
+
+def _stages(metrics_text: str) -> dict:
+    """Mean milliseconds and count per pipeline stage from the API's /metrics."""
+    totals = {}
+    for line in metrics_text.splitlines():
+        match = STAGE_PATTERN.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, {})[kind] = float(value)
+    return {
+        stage: {
+            "count": int(t.get("count", 0)),
+            "mean_ms": round(t["sum"] / t["count"] * 1000, 3) if t.get("count") else None,
+        }
+        for stage, t in sorted(totals.items())
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_report(samples, elapsed, config, stub_stats, metrics_text, started_at=None) -> dict:
+    by_route = {}
+    statuses = {}
+    for route, status, latency in samples:
+        by_route.setdefault(route, []).append((status, latency))
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    routes = {
+        route: _summary(
+            [latency for _, latency in rows],
+            sum(1 for status, _ in rows if status != 200),
+            elapsed,
+        )
+        for route, rows in sorted(by_route.items())
+    }
+    return {
+        "meta": {
+            "started_at": (started_at or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": config,
+        "overall": _summary(
+            [latency for _, _, latency in samples],
+            sum(1 for _, status, _ in samples if status != 200),
+            elapsed,
+        ),
+        "routes": routes,
+        "status_codes": dict(sorted(statuses.items())),
+        "upstream": stub_stats,
+        "stages": _stages(metrics_text) if metrics_text else {},
+    }
+
+
+def _delta(new, old) -> str:
+    if new is None or not old:
+        return ""
+    return f" ({(new - old) / old * 100:+.1f}%)"
+
+
+def render_markdown(report: dict, baseline: dict = None) -> str:
+    """Markdown summary; with a baseline report, each figure shows its relative change."""
+    config = report["config"]
+    lines = [
+        f"# CI_RP load test — {report['meta']['started_at']}",
+        "",
+        f"Commit `{report['meta']['commit']}`, Python {report['meta']['python']}. "
+        f"{config['concurrency']} concurrent clients, {config['workers']} worker(s), "
+        f"stub latency {config['stub_latency_ms']} ms + up to {config['stub_jitter_ms']} ms jitter, "
+        f"stub error rate {config['stub_error_rate']:.1%}.",
+        "",
+        "| Route | Requests | Errors | RPS | p50 ms | p95 ms | p99 ms | max ms |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    rows = [("**all**", report["overall"], (baseline or {}).get("overall"))]
+    rows += [
+        (route, summary, (baseline or {}).get("routes", {}).get(route))
+        for route, summary in report["routes"].items()
+    ]
+    for name, s, old in rows:
+        old = old or {}
+        cells = [str(s["requests"]), str(s["errors"])]
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"):
+            cells.append(f"{s[key]}{_delta(s[key], old.get(key))}")
+        lines.append(f"| {name} | " + " | ".join(cells) + " |")
+    lines += [
+        "",
+        "Status codes: " + ", ".join(f"{k}: {v}" for k, v in report["status_codes"].items()),
+        "",
+        f"Upstream (stub) calls: {report['upstream']['requests']}, "
+        f"failed: {report['upstream']['errors']}.",
+    ]
+    if report["stages"]:
+        lines += ["", "| Stage | Count | Mean ms |", "|---|---:|---:|"]
+        lines += [
+            f"| {stage} | {s['count']} | {s['mean_ms']} |" for stage, s in report["stages"].items()
+        ]
+        if config["workers"] > 1:
+            lines += ["", "_Stage timings come from a single worker's /metrics._"]
+    return "\n".join(lines) + "\n"
+
+
+async def run(args) -> dict:
+    config = {
+        "routes": args.routes,
+        "concurrency": args.concurrency,
+        "requests": None if args.duration else args.requests,
+        "duration_s": args.duration,
+        "warmup": args.warmup,
+        "workers": args.workers,
+        "stub_latency_ms": args.stub_latency_ms,
+        "stub_jitter_ms": args.stub_jitter_ms,
+        "stub_error_rate": args.stub_error_rate,
+        "seed": args.seed,
+    }
+    started_at = datetime.now(timezone.utc)
+    with StubServer(
+        latency_ms=args.stub_latency_ms,
+        jitter_ms=args.stub_jitter_ms,
+        error_rate=args.stub_error_rate,
+        seed=args.seed,
+    ) as stub:
+        port = _free_port()
+        api = _start_api(port, stub.url, args.workers)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.timeout
+            ) as client:
+                await _wait_ready(client, args.ready_timeout)
+                if args.warmup:
+                    await _drive(client, args.routes, args.concurrency, args.warmup, None)
+                samples, elapsed = await _drive(
+                    client, args.routes, args.concurrency, args.requests, args.duration
+                )
+                metrics_text = (await client.get("/metrics")).text
+        finally:
+            api.terminate()
+            api.wait(timeout=10)
+        return build_report(samples, elapsed, config, stub.stats(), metrics_text, started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--routes", nargs="+", default=DEFAULT_ROUTES)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run instead of a request count")
+    parser.add_argument("--warmup", type=int, default=100, help="unrecorded requests sent first")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--output", default="loadtest-report", help="report path without extension")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    markdown = render_markdown(report, baseline)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    with open(f"{args.output}.md", "w") as f:
+        f.write(markdown)
+    print(markdown)
+    print(f"Wrote {args.output}.json and {args.output}.md")
+
+
+if __name__ == "__main__":
+    main()
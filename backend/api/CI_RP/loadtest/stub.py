@@ -0,0 +1,199 @@
+"""
+Stub ElectricityMap server for offline load tests and local development.
+
+Serves canned ``carbon-intensity`` and ``power-breakdown`` ``history`` and
+``latest`` payloads for any zone, ending at the current UTC hour so the
+API's hourly cache behaves as in production. ``past-range`` serves any
+``start``/``end`` span of up to 10 days, for backfill runs. Every response can be
+delayed (``latency_ms`` plus uniform ``jitter_ms``) and a fraction of them
+fail with HTTP 500 (``error_rate``).
+
+Usage (from backend/api/CI_RP):
+    python -m loadtest.stub --port 8765 --latency-ms 80 --error-rate 0.01
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SIGNAL_FIELDS = {
+    "carbon-intensity": "carbonIntensity",
+    "power-breakdown": "renewablePercentage",
+}
+
+
+def _value(field: str, zone: str, ts: datetime) -> float:
+    # Smooth daily cycle, shifted per zone so zones differ but stay reproducible
+    phase = (sum(map(ord, zone)) % 24 + ts.hour) / 24 * 2 * math.pi
+    if field == "carbonIntensity":
+        return round(180 + 90 * math.sin(phase), 1)
+    return round(55 + 30 * math.cos(phase), 1)
+
+
+def _record(signal: str, zone: str, ts: datetime) -> dict:
+    field = SIGNAL_FIELDS[signal]
+    record = {
+        "zone": zone,
+        "datetime": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "updatedAt": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "isEstimated": False,
+        field: _value(field, zone, ts),
+    }
+    if signal == "power-breakdown":
+        record["fossilFreePercentage"] = min(100.0, record[field] + 10)
+    return record
+
+
+def _parse_time(value: str) -> datetime:
+    value = value.replace("Z", "+00:00")
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def payload(path: str, zone: str, now: datetime = None, params: dict = None) -> dict:
+    """
+    Canned response body for ``/v3/<signal>/<history|latest|past-range>``, or
+    None for unknown paths. Raises ValueError for a bad past-range span.
+    """
+    parts = path.strip("/").split("/")
+    kinds = ("history", "latest", "past-range")
+    if len(parts) < 2 or parts[-2] not in SIGNAL_FIELDS or parts[-1] not in kinds:
+        return None
+    signal, kind = parts[-2], parts[-1]
+    hour = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    if kind == "latest":
+        return _record(signal, zone, hour)
+    if kind == "past-range":
+        params = params or {}
+        start = _parse_time(params["start"]).replace(minute=0, second=0, microsecond=0)
+        end = min(_parse_time(params["end"]), hour + timedelta(hours=1))
+        if end <= start or end - start > timedelta(days=10):
+            raise ValueError("start must precede end by at most 10 days")
+        hours = math.ceil((end - start) / timedelta(hours=1))
+        return {"zone": zone, "data": [_record(signal, zone, start + timedelta(hours=i)) for i in range(hours)]}
+    history = [_record(signal, zone, hour - timedelta(hours=23 - i)) for i in range(24)]
+    return {"zone": zone, "history": history}
+
+
+class StubServer:
+    """Threaded stub ElectricityMap server; use as a context manager or call start/stop."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                zone = query.pop("zone", "PT").upper()
+                with stub._lock:
+                    stub.requests += 1
+                    delay = stub.latency_ms + stub._random.uniform(0, stub.jitter_ms)
+                    fail = stub._random.random() < stub.error_rate
+                    if fail:
+                        stub.errors += 1
+                if delay > 0:
+                    time.sleep(delay / 1000)
+                try:
+                    body = payload(url.path, zone, params=query)
+                except (KeyError, ValueError) as e:
+                    self._send(400, {"error": f"bad query: {e}"})
+                    return
+                if fail:
+                    self._send(500, {"error": "stub failure"})
+                elif body is None:
+                    self._send(404, {"error": f"unknown path {url.path}"})
+                else:
+                    self._send(200, body)
+
+            def _send(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    stub = StubServer(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed
+    )
+    print(f"Stub ElectricityMap serving at {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
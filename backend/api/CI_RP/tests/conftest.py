@@ -0,0 +1,53 @@
+"""
+Shared fixtures for the CI_RP test suite.
+
+The app reads its settings from the environment at import time, so the stub
+ElectricityMap server is bound and the environment set here, before any test
+module imports ``app``. Stores that write to ./data are disabled.
+"""
+import os
+
+import pytest
+
+from loadtest.stub import StubServer
+
+STUB = StubServer()
+
+os.environ.update(
+    ELECTRICITYMAP_BASE_URL=STUB.url,
+    ELECTRICITYMAP_API_KEY="test-key",
+    # Failures surface at once instead of after backoff
+    ELECTRICITYMAP_RETRIES="0",
+    HISTORY_STORE_PATH="",
+    PREDICTION_LEDGER_PATH="",
+    LOG_SAMPLE_RATE="0",
+    MODEL_PRELOAD="0",
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def stub():
+    STUB.start()
+    yield STUB
+    STUB.stop()
+
+
+@pytest.fixture
+def outage(stub):
+    """Make every upstream call fail; breakers and cached histories are reset afterwards."""
+    from app import utils
+
+    stub.error_rate = 1.0
+    yield stub
+    stub.error_rate = 0.0
+    utils._breakers.clear()
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,171 @@
+import pytest
+
+from app import utils
+
+
+@pytest.mark.parametrize("path", ["/api/carbon-intensity", "/api/renewable-percentage"])
+def test_signal_routes_serve_a_forecast(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["history"]) == 24
+    assert len(body["scaled_history"]) == 24
+    assert body["prediction_class"] in range(6)
+
+
+def test_async_pipeline_matches_sync_pipeline(client):
+    for name in utils.SIGNALS:
+        sync = utils.get_forecast([name])[name]
+        # Run on the app's event loop, where its batchers and caches live
+        result = client.portal.call(utils.get_forecast_async, [name])[name]
+        assert result["scaled_history"] == pytest.approx(sync["scaled_history"])
+        assert result["prediction_class"] == sync["prediction_class"]
+
+
+def test_outage_without_a_copy_is_a_gateway_error_then_503(client, outage):
+    assert client.get("/api/DE/forecast").status_code == 502
+    assert client.get("/api/DE/forecast").status_code == 502
+    assert client.get("/api/DE/forecast").status_code == 502
+    # The breakers are open now and fail fast
+    calls = outage.requests
+    response = client.get("/api/DE/forecast")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert outage.requests == calls
+
+
+def test_upstream_timeout_is_504(client, monkeypatch):
+    from electricitymap import ElectricityMapError
+
+    async def timeout(zone):
+        raise ElectricityMapError("timed out", "timeout")
+
+    monkeypatch.setattr("app.main.get_zone_forecast", timeout)
+    assert client.get("/api/forecast").status_code == 504
+
+
+def test_outage_serves_the_last_good_copy(client, stub):
+    first = client.get("/api/IT/forecast")
+    assert first.status_code == 200
+    utils._history_cache.expire()
+    stub.error_rate = 1.0
+    try:
+        response = client.get("/api/IT/forecast")
+    finally:
+        stub.error_rate = 0.0
+        utils._breakers.clear()
+    assert response.status_code == 200
+    assert response.headers["x-stale"] == "true"
+    assert response.json()["carbon_intensity"]["history"] == first.json()["carbon_intensity"]["history"]
+
+
+def _windows(n):
+    return [[100.0 + i + j for j in range(24)] for i in range(n)]
+
+
+def test_batch_classifies_json_and_binary_windows(client):
+    import numpy as np
+
+    windows = _windows(3)
+    response = client.post("/api/predict/batch", json=windows)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["classes"]) == 3
+    assert len(body["probabilities"][0]) == 6
+    binary = client.post(
+        "/api/predict/batch",
+        content=np.asarray(windows, dtype="<f4").tobytes(),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert binary.status_code == 200
+    assert binary.json()["classes"] == body["classes"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not json",
+        b'{"windows": []}',
+        b"[1, 2, 3]",
+        b"[]",
+        b'[["a", "b"]]',
+        b"[[1, 2, 3]]",
+        b"[[" + b", ".join([b"NaN"] * 24) + b"]]",
+        b"[[" + b"{}, " * 23 + b"{}]]",
+    ],
+)
+def test_batch_rejects_malformed_json_with_422(client, body):
+    response = client.post(
+        "/api/predict/batch", content=body, headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+
+
+def test_batch_rejects_partial_binary_windows_and_unknown_signals(client):
+    partial = client.post(
+        "/api/predict/batch",
+        content=b"\0" * 100,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert partial.status_code == 422
+    unknown = client.post("/api/predict/batch?signal=wind", json=_windows(1))
+    assert unknown.status_code == 422
+    bad_zone = client.post("/api/predict/batch?zone=not-a-zone!", json=_windows(1))
+    assert bad_zone.status_code == 422
+
+
+def test_batch_rejects_oversized_bodies_with_413(client, monkeypatch):
+    monkeypatch.setattr("app.main.BATCH_PREDICT_MAX_BYTES", 1000)
+    response = client.post("/api/predict/batch", json=_windows(10))
+    assert response.status_code == 413
+
+    def chunks():
+        # No Content-Length: the limit applies while reading
+        for _ in range(10):
+            yield b" " * 200
+
+    streamed = client.post(
+        "/api/predict/batch", content=chunks(), headers={"Content-Type": "application/json"}
+    )
+    assert streamed.status_code == 413
+
+
+def test_if_none_match_gives_304(client):
+    first = client.get("/api/forecast")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    response = client.get("/api/forecast", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # Weak comparison: the opaque tag matches with or without W/
+    assert client.get("/api/forecast", headers={"If-None-Match": etag[2:]}).status_code == 304
+    assert client.get("/api/forecast", headers={"If-None-Match": '"other", *'}).status_code == 200
+
+
+def test_etag_depends_on_the_representation(client):
+    records = client.get("/api/forecast").headers["etag"]
+    columnar = client.get("/api/forecast?layout=columnar")
+    assert columnar.headers["etag"] != records
+    assert client.get("/api/forecast", headers={"If-None-Match": columnar.headers["etag"]}).status_code == 200
+
+
+def test_if_modified_since_gives_304(client):
+    last_modified = client.get("/api/forecast").headers["last-modified"]
+    response = client.get("/api/forecast", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    older = client.get("/api/forecast", headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert older.status_code == 200
+    assert client.get("/api/forecast", headers={"If-Modified-Since": "garbage"}).status_code == 200
+
+
+def test_gzip_and_identity_bodies_share_a_weak_etag(client):
+    identity = client.get("/api/forecast", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/api/forecast", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert gzipped.headers["etag"].startswith("W/")
+    not_modified = client.get("/api/forecast", headers={"If-None-Match": identity.headers["etag"]})
+    for response in (identity, gzipped, not_modified):
+        assert response.headers["vary"].split(", ").count("Accept-Encoding") == 1
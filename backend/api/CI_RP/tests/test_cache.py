@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app import utils
+from app.cache import TTLCache, next_refresh
+
+
+def test_next_refresh_is_the_next_period_boundary_plus_grace():
+    assert next_refresh(7200, 3600, 120) == 10920
+    assert next_refresh(7199, 3600, 120) == 7320
+
+
+def test_concurrent_misses_share_one_load():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        cache = TTLCache()
+        values = await asyncio.gather(*(cache.get_or_fetch("key", fetch) for _ in range(50)))
+        assert values == ["value"] * 50
+        assert await cache.get_or_fetch("key", fetch) == "value"
+
+    asyncio.run(main())
+    assert calls == 1
+
+
+def test_failed_load_is_not_cached():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("upstream down")
+        return "value"
+
+    async def main():
+        cache = TTLCache()
+        results = await asyncio.gather(
+            *(cache.get_or_fetch("key", fetch) for _ in range(5)), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get_or_fetch("key", fetch) == "value"
+
+    asyncio.run(main())
+    assert calls == 2
+
+
+def test_concurrent_requests_make_one_upstream_call(client, stub):
+    async def burst():
+        return await asyncio.gather(
+            *(utils._fetch_history_async("carbon-intensity", "carbon_intensity", "FR") for _ in range(20))
+        )
+
+    # Let the startup refresh of the default zone finish first
+    client.portal.call(utils._refresher.refresh)
+    before = stub.requests
+    results = client.portal.call(burst)
+    assert stub.requests - before == 1
+    assert all(len(df) == 24 and not stale for df, stale in results)
+
+
+def test_expired_entry_is_served_stale_while_revalidating():
+    async def main():
+        cache = TTLCache()
+        cache.set("key", "old")
+        cache.expire()
+        loaded = asyncio.Event()
+
+        async def fetch():
+            loaded.set()
+            return "new"
+
+        assert await cache.get_or_revalidate("key", fetch) == ("old", True)
+        await loaded.wait()
+        await asyncio.sleep(0)
+        assert await cache.get_or_revalidate("key", fetch) == ("new", False)
+
+    asyncio.run(main())
+
+
+def test_refresh_waits_for_the_load_and_falls_back_on_failure():
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def fetch():
+        return "new"
+
+    async def main():
+        cache = TTLCache()
+        cache.set("key", "old")
+        cache.expire()
+        assert await cache.get_or_refresh("key", fail) == ("old", True)
+        assert await cache.get_or_refresh("key", fetch) == ("new", False)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_refresh("missing", fail)
+
+    asyncio.run(main())
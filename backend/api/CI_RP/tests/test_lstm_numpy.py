@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from electricitymap.lstm_numpy import NumpyModel
+
+keras = pytest.importorskip("tensorflow").keras
+
+SIGNALS = ("carbon_intensity", "renewable_percentage")
+
+
+@pytest.mark.parametrize("name", SIGNALS)
+def test_numpy_engine_matches_keras(name):
+    base = f"models/{name}/model_{name}"
+    reference = keras.models.load_model(f"{base}.keras")
+    model = NumpyModel.load(f"{base}.npz")
+    x = np.random.default_rng(0).uniform(0, 1, size=(64, 24, 1)).astype(np.float32)
+    expected = reference.predict(x, verbose=0)
+    result = model.predict(x)
+    assert result.shape == expected.shape
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-6)
+    assert (result.argmax(axis=1) == expected.argmax(axis=1)).all()
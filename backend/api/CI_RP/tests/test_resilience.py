@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.resilience import CircuitBreaker, CircuitOpenError
+
+
+async def _fail():
+    raise RuntimeError("upstream down")
+
+
+async def _ok():
+    return "ok"
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, base_delay=60)
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await breaker.call(_fail)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError) as error:
+            await breaker.call(_ok)
+        # Equal jitter: between half and all of the base delay
+        assert 30 <= error.value.retry_after <= 60
+
+    asyncio.run(main())
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await breaker.call(_fail)
+        assert await breaker.call(_ok) == "ok"
+        with pytest.raises(RuntimeError):
+            await breaker.call(_fail)
+        assert breaker.state == "closed"
+
+    asyncio.run(main())
+
+
+def test_half_open_trial_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=0.02, max_delay=0.04)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await breaker.call(_fail)
+        await asyncio.sleep(0.03)
+        assert breaker.state == "half-open"
+        # Only one trial call goes through while half-open
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.opens == 2
+        await asyncio.sleep(0.05)
+        assert await breaker.call(_ok) == "ok"
+        assert breaker.state == "closed"
+        assert breaker.opens == 0
+
+    asyncio.run(main())
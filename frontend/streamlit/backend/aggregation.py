@@ -0,0 +1,127 @@
+"""
+Window totals for the production, consumption, import and export breakdowns.
+
+The four breakdown matrices of a HistoryFrame (hours × sources), a
+"source listed" indicator per cell and each breakdown's total column are
+stacked side by side and cumulatively summed once over the hours. The total
+of any window is then the difference of two prefix rows, which costs
+O(sources) however many hours the window spans. A single vectorised
+subtraction gives every breakdown for every range in the time-range
+selectboxes. Ranges end at ``snapshot_end(frame)``, so one result serves
+every range of a snapshot. It is kept for the frame object it came from:
+``backend.api`` hands out the same frame until the shared history entry
+changes, so nothing is hashed or recomputed on a rerun.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from backend.history_frame import HistoryFrame
+
+# Hours offered by the "Select time range" selectboxes
+RANGES = (24, 12, 6, 3, 1)
+
+
+def snapshot_end(frame: Optional[HistoryFrame]) -> datetime:
+    """
+    End of the newest hour in ``frame`` (the current time when there is no
+    data). Every time range is measured back from it, so an h-hour range
+    covers exactly the h newest hourly rows, whatever the wall-clock minute.
+    """
+    if frame is None or not len(frame):
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(int(frame.times[-1]), timezone.utc) + timedelta(hours=1)
+
+
+def _plain(value: float):
+    # Whole numbers stay ints, as summing the raw JSON values gave
+    return int(value) if float(value).is_integer() else float(value)
+
+
+class WindowAggregator:
+    """Prefix sums over one frame's breakdowns."""
+
+    def __init__(self, frame: Optional[HistoryFrame]):
+        self.times = frame.times if frame is not None else np.empty(0, dtype=np.int64)
+        # breakdown -> (sources, value columns, listed columns, total column)
+        self.layout = {}
+        blocks = []
+        column = 0
+        for key, breakdown in (frame.breakdowns if frame is not None else {}).items():
+            n = len(breakdown.sources)
+            blocks += [
+                np.nan_to_num(breakdown.values),
+                breakdown.present.astype(np.float64),
+                np.nan_to_num(breakdown.total)[:, None],
+            ]
+            self.layout[key] = (
+                breakdown.sources,
+                slice(column, column + n),
+                slice(column + n, column + 2 * n),
+                column + 2 * n,
+            )
+            column += 2 * n + 1
+        matrix = np.hstack(blocks) if blocks else np.zeros((len(self.times), 0))
+        # Row i holds the sums of hours [0, i)
+        self.prefix = np.zeros((len(self.times) + 1, matrix.shape[1]))
+        np.cumsum(matrix, axis=0, out=self.prefix[1:])
+
+    def sums(self, starts, ends) -> np.ndarray:
+        """Column sums over the hours with ``start <= t <= end`` (Unix seconds), one row per window."""
+        lo = np.searchsorted(self.times, np.asarray(starts, dtype=np.float64), side="left")
+        hi = np.searchsorted(self.times, np.asarray(ends, dtype=np.float64), side="right")
+        hi = np.maximum(hi, lo)
+        # Rounding hides the cancellation error of subtracting large prefix sums
+        return np.round(self.prefix[hi] - self.prefix[lo], 6)
+
+    def _unpack(self, row: np.ndarray, key: str) -> Tuple[dict, float]:
+        if key not in self.layout:
+            return {}, 0
+        sources, values, listed, total = self.layout[key]
+        totals = {
+            source: _plain(value)
+            for source, value, count in zip(sources, row[values], row[listed])
+            if count > 0
+        }
+        return totals, _plain(row[total])
+
+    def window(self, key: str, start: datetime, end: datetime) -> Tuple[dict, float]:
+        """``({source: total}, total)`` for one breakdown over ``[start, end]``."""
+        row = self.sums([start.timestamp()], [end.timestamp()])[0]
+        return self._unpack(row, key)
+
+    def windows(self, now: datetime, ranges: Iterable[int] = RANGES) -> Dict[int, Dict[str, tuple]]:
+        """Every breakdown over ``[now - hours, now]`` for each of ``ranges``."""
+        ranges = list(ranges)
+        end = now.timestamp()
+        rows = self.sums([end - hours * 3600 for hours in ranges], [end] * len(ranges))
+        return {
+            hours: {key: self._unpack(row, key) for key in self.layout}
+            for hours, row in zip(ranges, rows)
+        }
+
+
+# (frame, now, windows) of the last aggregation; compared by identity, not hashed
+_last = (None, None, {})
+
+
+def aggregate_windows(frame: Optional[HistoryFrame], now: datetime) -> Dict[int, Dict[str, tuple]]:
+    """All four breakdowns for every selectable range, from one set of prefix sums."""
+    global _last
+    last_frame, last_now, windows = _last
+    if frame is None or frame is not last_frame or now != last_now:
+        windows = WindowAggregator(frame).windows(now)
+        _last = (frame, now, windows)
+    return windows
+
+
+def breakdown_window(frame: Optional[HistoryFrame], key: str, time_hours: int, now: datetime):
+    """
+    Returns ``({source: total}, total)`` for one breakdown over
+    ``[now - time_hours, now]``. Only sources listed by at least one of those
+    hours are included, and missing or null values count as zero.
+    """
+    if time_hours in RANGES:
+        return aggregate_windows(frame, now)[time_hours].get(key, ({}, 0))
+    return WindowAggregator(frame).window(key, now - timedelta(hours=time_hours), now)
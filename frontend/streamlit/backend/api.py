@@ -1,16 +1,71 @@
 import os
-import requests
-from dotenv import load_dotenv
+from typing import Optional
+
 import streamlit as st
+from dotenv import load_dotenv
+from electricitymap import ElectricityMapClient, HistoryStore, IncrementalHistory
+
+from backend.cache import derived, shared_cache
+from backend.history_frame import HistoryFrame, build_history_frame
 
 # Load environment variables from the .env file
 load_dotenv()
 
+# "incremental" polls /latest into a rolling 24 h buffer; "full" downloads /history every time
+INGEST_MODE = os.getenv("ELECTRICITYMAP_INGEST", "incremental")
+# Local store that accumulates every fetched hour beyond the upstream's 24 h ("" disables it)
+HISTORY_STORE_PATH = os.getenv("HISTORY_STORE_PATH", "./data/history.sqlite3")
+
+
+@st.cache_resource
+def get_client() -> ElectricityMapClient:
+    """
+    Returns the ElectricityMap client shared by every page and session.
+
+    It keeps a pool of keep-alive connections open, so page loads after the
+    first one skip the TCP/TLS setup. Timeouts, retries and the API key come
+    from the ELECTRICITYMAP_* environment variables.
+    """
+    return ElectricityMapClient.from_env()
+
+
+@st.cache_resource
+def get_feed(signal: str, zone: str) -> IncrementalHistory:
+    """
+    Returns the rolling history for one signal and zone, shared by every session.
+
+    The first refresh downloads the full history; later ones fetch only the
+    newest record from the /latest endpoint and merge it in.
+    """
+    return IncrementalHistory(get_client(), signal, zone)
+
+
+@st.cache_resource
+def get_store():
+    """Returns the local history store shared by every page, or None when disabled."""
+    return HistoryStore(HISTORY_STORE_PATH) if HISTORY_STORE_PATH else None
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+
+def _fetch_history(signal: str, zone: str) -> dict:
+    if INGEST_MODE == "incremental":
+        feed = get_feed(signal, zone)
+        feed.refresh()
+        data = feed.raw()
+    else:
+        data = get_client().history(signal, zone).raw
+    store = get_store()
+    if store is not None:
+        try:
+            store.append(signal, zone, data.get("history", []))
+        except Exception as e:
+            print(f"Error writing {signal} history to the local store: {e}")
+    return data
+
+
+@shared_cache(ttl=300)  # Cache for 5 minutes, shared by every process on the host
 def fetch_carbon_intensity_history(zone: str = "PT") -> dict:
     """
-    Fetches the power breakdown history data for the specified zone (default: Portugal)
+    Fetches the carbon intensity history data for the specified zone (default: Portugal)
     from the ElectricityMap API.
 
     Args:
@@ -19,21 +74,14 @@ def fetch_carbon_intensity_history(zone: str = "PT") -> dict:
     Returns:
         dict: The JSON response from the API, or an empty dict in case of an error.
     """
-    endpoint = f"https://api.electricitymap.org/v3/carbon-intensity/history?zone={zone}"
-    # Retrieve the API key from the environment variables
-    api_key = os.getenv("ELECTRICITYMAP_API_KEY")
-    headers = {"auth-token": api_key}
-
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return _fetch_history("carbon-intensity", zone)
     except Exception as e:
-        print(f"Error fetching power breakdown history: {e}")
+        print(f"Error fetching carbon intensity history: {e}")
         return {}
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+@shared_cache(ttl=300)  # Cache for 5 minutes, shared by every process on the host
 def fetch_power_breakdown_history(zone: str = "PT") -> dict:
     """
     Fetches the power breakdown history data for the specified zone (default: Portugal)
@@ -45,23 +93,38 @@ def fetch_power_breakdown_history(zone: str = "PT") -> dict:
     Returns:
         dict: The JSON response from the API, or an empty dict in case of an error.
     """
-    endpoint = f"https://api.electricitymap.org/v3/power-breakdown/history?zone={zone}"
-    # Retrieve the API key from the environment variables
-    api_key = os.getenv("ELECTRICITYMAP_API_KEY")
-    headers = {"auth-token": api_key}
-
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return _fetch_history("power-breakdown", zone)
     except Exception as e:
         print(f"Error fetching power breakdown history: {e}")
         return {}
 
 
+def fetch_carbon_intensity_frame(zone: str = "PT") -> Optional[HistoryFrame]:
+    """
+    Returns the carbon intensity history for the specified zone parsed once into
+    a columnar HistoryFrame, or None if no data is available. The frame is
+    rebuilt only when the shared history cache stores a new payload.
+    """
+    return derived(fetch_carbon_intensity_history, build_history_frame, zone)
+
+
+def fetch_power_breakdown_frame(zone: str = "PT") -> Optional[HistoryFrame]:
+    """
+    Returns the power breakdown history for the specified zone parsed once into
+    a columnar HistoryFrame (scalar series plus production, consumption, import
+    and export matrices), or None if no data is available. The frame is
+    rebuilt only when the shared history cache stores a new payload.
+    """
+    return derived(fetch_power_breakdown_history, build_history_frame, zone)
+
+
 if __name__ == "__main__":
     # Example usage for testing purposes:
 
     # Fetch power breakdown history for Portugal
     power_data = fetch_power_breakdown_history("PT")
     print("Power Breakdown Data:", power_data)
+    print("Upstream calls:", get_client().stats())
+    if get_store() is not None:
+        print("Stored hours:", get_store().span("power-breakdown", "PT"))
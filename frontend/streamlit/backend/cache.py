@@ -0,0 +1,225 @@
+"""
+Cache backends for the upstream fetchers in backend.api.
+
+``@st.cache_data`` keeps one cache per process, so every Streamlit replica
+fetches and stores its own copy. The "sqlite" backend (the default) keeps
+the fetched payloads in one SQLite file that all processes on the host
+share. Each value is replaced with a single statement, so readers never see
+a half-written entry. A short lease per key makes sure that only one
+replica refreshes an expired entry. The others keep serving the previous
+value until the new one lands, or, on a cold start, wait for it. "memory"
+keeps the per-process behaviour, with one refresh per key at a time.
+``derived`` caches values computed from a fetcher's result (parsed frames)
+for exactly as long as that shared entry is unchanged.
+
+    FETCH_CACHE_BACKEND=sqlite|memory
+    FETCH_CACHE_PATH=./data/fetch_cache.sqlite3
+"""
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+class MemoryCache:
+    """Per-process cache; concurrent misses on one key share a single load."""
+
+    def __init__(self):
+        # key -> (value, expires, updated)
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def stamp(self, key: str) -> Optional[Tuple[float, float]]:
+        """(updated, expires) of the stored value, or None if there is none."""
+        entry = self._entries.get(key)
+        return None if entry is None else (entry[2], entry[1])
+
+    def get_or_load(self, key: str, ttl: float, loader: Callable):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                return entry[0]
+            value = loader()
+            if not value and entry is not None:
+                # Failed refresh: keep serving the last good value
+                self._entries[key] = (entry[0], time.time() + ttl, entry[2])
+                return entry[0]
+            self._entries[key] = (value, time.time() + ttl, time.time())
+            return value
+
+
+class SQLiteCache:
+    """
+    Cache shared by every process that opens the same file.
+
+    Values must be JSON-serialisable. ``lease`` bounds how long other
+    processes defer to a refresher that has crashed or hung.
+    """
+
+    def __init__(self, path: str, lease: float = 30.0, poll: float = 0.1):
+        self.path = path
+        self.lease = lease
+        self.poll = poll
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            if self._conn is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                # Autocommit: every statement below is its own atomic transaction
+                conn = sqlite3.connect(
+                    self.path, timeout=10, isolation_level=None, check_same_thread=False
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._conn = conn
+            return self._conn.execute(sql, params)
+
+    def _read(self, key: str):
+        return self._execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+
+    def stamp(self, key: str) -> Optional[Tuple[float, float]]:
+        """(updated, expires) of the stored value, or None if there is none."""
+        return self._execute("SELECT updated, expires FROM entries WHERE key = ?", (key,)).fetchone()
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        now = time.time()
+        cursor = self._execute(
+            "INSERT INTO leases (key, owner, until) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, until = excluded.until "
+            "WHERE leases.until < ?",
+            (key, owner, now + self.lease, now),
+        )
+        return cursor.rowcount == 1
+
+    def _release(self, key: str, owner: str) -> None:
+        self._execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_or_load(self, key: str, ttl: float, loader: Callable):
+        row = self._read(key)
+        if row is not None and row[1] > time.time():
+            return json.loads(row[0])
+        owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        if self._acquire(key, owner):
+            try:
+                value = loader()
+                if not value and row is not None:
+                    # Failed refresh: keep serving the last good value
+                    self._execute(
+                        "UPDATE entries SET expires = ? WHERE key = ?", (time.time() + ttl, key)
+                    )
+                    return json.loads(row[0])
+                now = time.time()
+                self._execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires, updated) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, separators=(",", ":")), now + ttl, now),
+                )
+                return value
+            finally:
+                self._release(key, owner)
+        if row is not None:
+            # Another process is refreshing; the previous value is still good enough
+            return json.loads(row[0])
+        deadline = time.time() + self.lease
+        while time.time() < deadline:
+            time.sleep(self.poll)
+            row = self._read(key)
+            if row is not None:
+                return json.loads(row[0])
+        return loader()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend chosen by FETCH_CACHE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.getenv("FETCH_CACHE_BACKEND", "sqlite")
+            if kind == "sqlite":
+                _backend = SQLiteCache(os.getenv("FETCH_CACHE_PATH", "./data/fetch_cache.sqlite3"))
+            elif kind == "memory":
+                _backend = MemoryCache()
+            else:
+                raise ValueError(f"Unknown FETCH_CACHE_BACKEND {kind!r}; expected sqlite or memory")
+        return _backend
+
+
+def shared_cache(ttl: float):
+    """Cache a fetcher's result for ``ttl`` seconds per argument set in the configured backend."""
+
+    def decorate(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        def cache_key(*args, **kwargs) -> str:
+            return f"{name}:{json.dumps([args, kwargs], sort_keys=True, default=str)}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return get_backend().get_or_load(
+                cache_key(*args, **kwargs), ttl, lambda: fn(*args, **kwargs)
+            )
+
+        wrapper.cache_key = cache_key
+        return wrapper
+
+    return decorate
+
+
+# (transform, source key) -> (source entry's updated time, derived value)
+_derived = {}
+
+
+def derived(source: Callable, transform: Callable, *args, **kwargs):
+    """
+    ``transform(source(*args, **kwargs))``, kept in this process while the
+    shared entry behind ``source`` (a ``shared_cache`` fetcher) is unchanged.
+
+    The derived value expires with that entry and is rebuilt only when a
+    refresh actually stored a new value, so it is never older than the
+    source's own ``ttl`` and is computed once per refresh.
+    """
+    key = source.cache_key(*args, **kwargs)
+    backend = get_backend()
+    memo = _derived.get((transform, key))
+    stamp = backend.stamp(key)
+    if memo is not None and stamp is not None and memo[0] == stamp[0] and stamp[1] > time.time():
+        return memo[1]
+    value = source(*args, **kwargs)
+    stamp = backend.stamp(key)
+    if memo is not None and stamp is not None and memo[0] == stamp[0]:
+        # Served the same entry again (failed refresh, or another process refreshing)
+        return memo[1]
+    result = transform(value)
+    if stamp is not None:
+        _derived[(transform, key)] = (stamp[0], result)
+    return result
@@ -2,9 +2,9 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 import joblib
-import tensorflow as tf
 import os
-from backend.api import fetch_carbon_intensity_history
+from electricitymap.lstm_numpy import NumpyModel
+from backend.api import fetch_carbon_intensity_frame
 from backend.carbon_intensity.carbon_intensity_utils import (
     get_bg_color_CI,
     colored_metric,
@@ -19,17 +19,9 @@ def load_model_and_scalers():
         # compute the folder that Home.py lives in
         HERE = os.path.dirname(__file__)
 
-        # point at assets/images/logo.png inside the same folder
-        model_path = os.path.join(HERE, "models", "model_carbon_intensity.keras")
-
-        # Load model with custom_objects to handle any custom components
-        model = tf.keras.models.load_model(
-            model_path,
-            compile=False,
-        )
-        # Recompile the model with default settings
-        model.compile(
-            optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
+        # Weights exported from the .keras model; served with NumPy, no TensorFlow
+        model = NumpyModel.load(
+            os.path.join(HERE, "models", "model_carbon_intensity.npz")
         )
 
         # Load scalers using relative paths
@@ -49,23 +41,13 @@ def load_model_and_scalers():
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_and_process_data():
     """Cache the data fetching and processing"""
-    data_ci = fetch_carbon_intensity_history(zone="PT")
-    if not data_ci or not data_ci.get("history"):
-        return None
-
-    historico_carbon = data_ci["history"]
-    df_ci = pd.DataFrame(historico_carbon)
-    df_ci["datetime"] = pd.to_datetime(df_ci["datetime"])
-    df_ci = df_ci.sort_values(by="datetime", ascending=True)
-
-    if "carbonIntensity" not in df_ci.columns:
+    frame = fetch_carbon_intensity_frame(zone="PT")
+    if frame is None or not frame.has("carbonIntensity"):
         return None
 
     # Take the last 24 hours of data
-    df_ci = df_ci[["datetime", "carbonIntensity"]].tail(24).reset_index(drop=True)
-    df_ci.rename(
-        columns={"carbonIntensity": "Carbon Intensity gCO₂eq/kWh (LCA)"}, inplace=True
-    )
+    df_ci = frame.to_pandas({"carbonIntensity": "Carbon Intensity gCO₂eq/kWh (LCA)"})
+    df_ci = df_ci.tail(24).reset_index(drop=True)
 
     return df_ci
 
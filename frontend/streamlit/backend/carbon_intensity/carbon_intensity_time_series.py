@@ -1,34 +1,21 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 import numpy as np
 from datetime import datetime, timedelta, timezone
-from backend.api import fetch_carbon_intensity_history
+from backend.api import fetch_carbon_intensity_frame
 
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_carbon_intensity_data():
     """Cache the carbon intensity data fetching and processing"""
     now_dt = datetime.now(timezone.utc)
-    data_ci = fetch_carbon_intensity_history(zone="PT")
+    frame = fetch_carbon_intensity_frame(zone="PT")
 
-    if not data_ci or not data_ci.get("history"):
-        return None, None
-
-    historico_carbon = data_ci.get("history", [])
-    if not historico_carbon:
-        return None, None
-
-    df_ci = pd.DataFrame(historico_carbon)
-    df_ci["datetime"] = pd.to_datetime(df_ci["datetime"])
-    df_ci = df_ci.sort_values(by="datetime", ascending=True)
-
-    if "carbonIntensity" not in df_ci.columns:
+    if frame is None or not frame.has("carbonIntensity"):
         return None, None
 
     # Select and rename columns
-    df_ci = df_ci[["datetime", "carbonIntensity"]].copy()
-    df_ci.rename(columns={"carbonIntensity": "LCA"}, inplace=True)
+    df_ci = frame.to_pandas({"carbonIntensity": "LCA"})
 
     # Filter to the last 24 hours
     cutoff_ci = now_dt - timedelta(hours=24)
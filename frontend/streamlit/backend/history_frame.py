@@ -0,0 +1,113 @@
+"""
+Columnar view of one ElectricityMap history payload, built once and shared
+by every dashboard module.
+
+The raw ``history`` list is walked a single time. Timestamps become int64
+Unix seconds (sorted, one row per hour), scalar fields such as
+``renewablePercentage`` become float64 arrays, and each breakdown
+(production, consumption, import, export) becomes a dense hours × sources
+float64 matrix with a source-name index. Missing and null values are NaN.
+``present`` records which sources a row listed at all.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Breakdown name -> (breakdown field, total field) in power-breakdown rows
+BREAKDOWNS = {
+    "production": ("powerProductionBreakdown", "powerProductionTotal"),
+    "consumption": ("powerConsumptionBreakdown", "powerConsumptionTotal"),
+    "import": ("powerImportBreakdown", "powerImportTotal"),
+    "export": ("powerExportBreakdown", "powerExportTotal"),
+}
+BREAKDOWN_FIELDS = {field for field, _ in BREAKDOWNS.values()}
+
+
+@dataclass(frozen=True)
+class Breakdown:
+    sources: Tuple[str, ...]
+    # hours x sources, NaN where a row has no (or a null) value for a source
+    values: np.ndarray
+    # hours x sources, True where the row lists the source (even as null)
+    present: np.ndarray
+    # hours, NaN where the row has no total
+    total: np.ndarray
+
+
+@dataclass(frozen=True)
+class HistoryFrame:
+    zone: Optional[str]
+    # Unix seconds, ascending
+    times: np.ndarray
+    # Scalar fields by their upstream (camelCase) name
+    series: Dict[str, np.ndarray]
+    breakdowns: Dict[str, Breakdown]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def has(self, name: str) -> bool:
+        return name in self.series
+
+    @property
+    def datetimes(self) -> pd.DatetimeIndex:
+        return pd.to_datetime(self.times, unit="s", utc=True)
+
+    def to_pandas(self, columns: Dict[str, str]) -> pd.DataFrame:
+        """A ``datetime`` column plus the given series, renamed ``{upstream name: column}``."""
+        data = {"datetime": self.datetimes}
+        data.update({column: self.series[name] for name, column in columns.items()})
+        return pd.DataFrame(data)
+
+
+def _number(value) -> float:
+    return np.nan if value is None else value
+
+
+def build_history_frame(data: dict) -> Optional[HistoryFrame]:
+    """Parse a ``/history`` payload; None when it has no rows."""
+    rows = [row for row in (data or {}).get("history") or [] if row.get("datetime")]
+    if not rows:
+        return None
+    times = pd.to_datetime([row["datetime"] for row in rows], utc=True, format="ISO8601").as_unit("s").asi8
+    order = np.argsort(times, kind="stable")
+    # When an hour appears twice, its later copy wins
+    ordered = times[order]
+    order = order[np.r_[ordered[1:] != ordered[:-1], True]]
+    rows = [rows[i] for i in order]
+
+    names = []
+    for row in rows:
+        for name, value in row.items():
+            if name in BREAKDOWN_FIELDS or name in names:
+                continue
+            if value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+                names.append(name)
+    series = {
+        name: np.array([_number(row.get(name)) for row in rows], dtype=np.float64) for name in names
+    }
+
+    breakdowns = {}
+    for key, (field, total_field) in BREAKDOWNS.items():
+        if not any(field in row for row in rows):
+            continue
+        index = {}
+        for row in rows:
+            for source in row.get(field) or {}:
+                index.setdefault(source, len(index))
+        values = np.full((len(rows), len(index)), np.nan)
+        present = np.zeros((len(rows), len(index)), dtype=bool)
+        for i, row in enumerate(rows):
+            for source, value in (row.get(field) or {}).items():
+                present[i, index[source]] = True
+                if value is not None:
+                    values[i, index[source]] = value
+        total = np.array([_number(row.get(total_field)) for row in rows], dtype=np.float64)
+        breakdowns[key] = Breakdown(tuple(index), values, present, total)
+
+    return HistoryFrame(
+        zone=data.get("zone"), times=times[order], series=series, breakdowns=breakdowns
+    )
+
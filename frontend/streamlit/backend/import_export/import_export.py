@@ -1,62 +1,31 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from datetime import datetime, timedelta, timezone
-from backend.api import fetch_power_breakdown_history
+from datetime import timedelta
+from backend.api import fetch_power_breakdown_frame
+from backend.aggregation import breakdown_window, snapshot_end
 
 
 # -----------------------------
 # Aggregation Functions
 # -----------------------------
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def aggregate_import(history, time_hours, now):
+def aggregate_import(frame, time_hours, now):
     """
-    Aggregates 'powerImportBreakdown' and 'powerImportTotal'
+    Aggregates the import breakdown and 'powerImportTotal'
     from records within [now - time_hours, now].
     """
     limite = now - timedelta(hours=time_hours)
-    import_breakdown_total = {}
-    import_total_sum = 0
-    for registro in history:
-        dt_str = registro.get("datetime")
-        if not dt_str:
-            continue
-        dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-        if dt < limite or dt > now:
-            continue
-        imp_breakdown = registro.get("powerImportBreakdown", {})
-        for key, val in imp_breakdown.items():
-            val = val if val is not None else 0
-            import_breakdown_total[key] = import_breakdown_total.get(key, 0) + val
-        val_total = registro.get("powerImportTotal", 0)
-        val_total = val_total if val_total is not None else 0
-        import_total_sum += val_total
+    import_breakdown_total, import_total_sum = breakdown_window(frame, "import", time_hours, now)
     return import_breakdown_total, import_total_sum, limite
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def aggregate_export(history, time_hours, now):
+def aggregate_export(frame, time_hours, now):
     """
-    Aggregates 'powerExportBreakdown' and 'powerExportTotal'
+    Aggregates the export breakdown and 'powerExportTotal'
     from records within [now - time_hours, now].
     """
     limite = now - timedelta(hours=time_hours)
-    export_breakdown_total = {}
-    export_total_sum = 0
-    for registro in history:
-        dt_str = registro.get("datetime")
-        if not dt_str:
-            continue
-        dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-        if dt < limite or dt > now:
-            continue
-        exp_breakdown = registro.get("powerExportBreakdown", {})
-        for key, val in exp_breakdown.items():
-            val = val if val is not None else 0
-            export_breakdown_total[key] = export_breakdown_total.get(key, 0) + val
-        val_total = registro.get("powerExportTotal", 0)
-        val_total = val_total if val_total is not None else 0
-        export_total_sum += val_total
+    export_breakdown_total, export_total_sum = breakdown_window(frame, "export", time_hours, now)
     return export_breakdown_total, export_total_sum, limite
 
 
@@ -231,16 +200,14 @@ def render_metrics_panel(import_data_dict, export_data_dict):
 # -----------------------------
 # Data Fetching Function
 # -----------------------------
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_and_process_data(time_hours):
+def fetch_and_process_data():
     """
-    Fetches and processes the power breakdown history data with caching.
-    Returns the processed data and current datetime.
+    Fetches the power breakdown history frame (parsed once per upstream refresh).
+    Returns the frame and the end of its newest hour, which every time range
+    is measured back from.
     """
-    data = fetch_power_breakdown_history(zone="PT")
-    historico = data.get("history", [])
-    now_dt = datetime.now(timezone.utc)
-    return historico, now_dt
+    frame = fetch_power_breakdown_frame(zone="PT")
+    return frame, snapshot_end(frame)
 
 
 # -----------------------------
@@ -267,8 +234,8 @@ def render_pie_charts2():
     except Exception:
         time_hours = 1
 
-    # Fetch API history data with caching
-    historico, now_dt = fetch_and_process_data(time_hours)
+    # Fetch the parsed history frame with caching
+    frame, now_dt = fetch_and_process_data()
 
     # Create two columns: left for Import and Production; right for Export and Consumption
     col1, col2 = st.columns(2)
@@ -276,7 +243,7 @@ def render_pie_charts2():
     with col1:
         # Plot Power Import Breakdown
         st.write("**Power Import Breakdown**")
-        imp_total, imp_sum, limite_imp = aggregate_import(historico, time_hours, now_dt)
+        imp_total, imp_sum, limite_imp = aggregate_import(frame, time_hours, now_dt)
         fig_imp = plot_breakdown_chart_interactive(
             imp_total, imp_sum, limite_imp, now_dt, "Power Import Breakdown", time_hours
         )
@@ -296,7 +263,7 @@ def render_pie_charts2():
         # Plot Power Export Breakdown
         st.write("**Power Export Breakdown**")
         export_total, export_sum, limite_export = aggregate_export(
-            historico, time_hours, now_dt
+            frame, time_hours, now_dt
         )
         fig_export = plot_breakdown_chart_interactive(
             export_total,
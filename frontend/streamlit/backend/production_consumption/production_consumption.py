@@ -1,76 +1,45 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from datetime import datetime, timedelta, timezone
-from backend.api import fetch_power_breakdown_history
+from datetime import timedelta
+from backend.api import fetch_power_breakdown_frame
+from backend.aggregation import breakdown_window, snapshot_end
 
 
 # -----------------------------
 # Aggregation Functions
 # -----------------------------
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_and_process_data(time_hours):
+def fetch_and_process_data():
     """
-    Fetches and processes the power breakdown history data with caching.
-    Returns the processed data and current datetime.
+    Fetches the power breakdown history frame (parsed once per upstream refresh).
+    Returns the frame and the end of its newest hour, which every time range
+    is measured back from.
     """
-    data = fetch_power_breakdown_history(zone="PT")
-    historico = data.get("history", [])
-    now_dt = datetime.now(timezone.utc)
-    return historico, now_dt
+    frame = fetch_power_breakdown_frame(zone="PT")
+    return frame, snapshot_end(frame)
 
 
-def aggregate_production(history, time_hours, now):
+def aggregate_production(frame, time_hours, now):
     """
-    Aggregates 'powerProductionBreakdown' and 'powerProductionTotal'
+    Aggregates the production breakdown and 'powerProductionTotal'
     from records within [now - time_hours, now].
     """
     limite = now - timedelta(hours=time_hours)
-    production_breakdown_total = {}
-    production_total_sum = 0
-    for registro in history:
-        dt_str = registro.get("datetime")
-        if not dt_str:
-            continue
-        dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-        if dt < limite or dt > now:
-            continue
-        prod_breakdown = registro.get("powerProductionBreakdown", {})
-        for key, val in prod_breakdown.items():
-            val = val if val is not None else 0
-            production_breakdown_total[key] = (
-                production_breakdown_total.get(key, 0) + val
-            )
-        val_total = registro.get("powerProductionTotal", 0)
-        val_total = val_total if val_total is not None else 0
-        production_total_sum += val_total
+    production_breakdown_total, production_total_sum = breakdown_window(
+        frame, "production", time_hours, now
+    )
     return production_breakdown_total, production_total_sum, limite
 
 
-def aggregate_consumption(history, time_hours, now):
+def aggregate_consumption(frame, time_hours, now):
     """
-    Aggregates 'powerConsumptionBreakdown' and 'powerConsumptionTotal'
+    Aggregates the consumption breakdown and 'powerConsumptionTotal'
     from records within [now - time_hours, now].
     """
     limite = now - timedelta(hours=time_hours)
-    consumption_breakdown_total = {}
-    consumption_total_sum = 0
-    for registro in history:
-        dt_str = registro.get("datetime")
-        if not dt_str:
-            continue
-        dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-        if dt < limite or dt > now:
-            continue
-        cons_breakdown = registro.get("powerConsumptionBreakdown", {})
-        for key, val in cons_breakdown.items():
-            val = val if val is not None else 0
-            consumption_breakdown_total[key] = (
-                consumption_breakdown_total.get(key, 0) + val
-            )
-        val_total = registro.get("powerConsumptionTotal", 0)
-        val_total = val_total if val_total is not None else 0
-        consumption_total_sum += val_total
+    consumption_breakdown_total, consumption_total_sum = breakdown_window(
+        frame, "consumption", time_hours, now
+    )
     return consumption_breakdown_total, consumption_total_sum, limite
 
 
@@ -335,8 +304,8 @@ def render_pie_charts():
     except Exception:
         time_hours = 1
 
-    # Fetch API history data with caching
-    historico, now_dt = fetch_and_process_data(time_hours)
+    # Fetch the parsed history frame with caching
+    frame, now_dt = fetch_and_process_data()
 
     # Create two columns: left for Import and Production; right for Export and Consumption
     col1, col2 = st.columns(2)
@@ -345,7 +314,7 @@ def render_pie_charts():
         # Plot Power Production Breakdown
         st.write("**Power Production Breakdown**")
         prod_total, prod_sum, limite_prod = aggregate_production(
-            historico, time_hours, now_dt
+            frame, time_hours, now_dt
         )
         fig_prod = plot_breakdown_chart_interactive(
             prod_total,
@@ -371,7 +340,7 @@ def render_pie_charts():
         # Plot Power Consumption Breakdown
         st.write("**Power Consumption Breakdown**")
         cons_total, cons_sum, limite_cons = aggregate_consumption(
-            historico, time_hours, now_dt
+            frame, time_hours, now_dt
         )
         fig_cons = plot_breakdown_chart_interactive(
             cons_total,
@@ -3,9 +3,9 @@ import streamlit.components.v1 as components
 import numpy as np
 import pandas as pd
 import joblib
-import tensorflow as tf
 import os
-from backend.api import fetch_power_breakdown_history
+from electricitymap.lstm_numpy import NumpyModel
+from backend.api import fetch_power_breakdown_frame
 
 
 def get_bg_color_RP(value):
@@ -28,17 +28,9 @@ def load_model_and_scalers():
     try:
         # compute the folder that renewable_percentage_ai.py lives in
         HERE = os.path.dirname(__file__)
-        # point at assets/images/logo.png inside the same folder
-        model_path = os.path.join(HERE, "models", "model_renewable_percentage.keras")
-
-        # Load model with custom_objects to handle any custom components
-        model = tf.keras.models.load_model(
-            model_path,
-            compile=False,
-        )
-        # Recompile the model with default settings
-        model.compile(
-            optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
+        # Weights exported from the .keras model; served with NumPy, no TensorFlow
+        model = NumpyModel.load(
+            os.path.join(HERE, "models", "model_renewable_percentage.npz")
         )
 
         # Load scalers
@@ -58,21 +50,13 @@ def load_model_and_scalers():
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_and_process_data():
     """Cache the data fetching and processing"""
-    data_rp = fetch_power_breakdown_history(zone="PT")
-    if not data_rp or not data_rp.get("history"):
-        return None
-
-    historico_rp = data_rp["history"]
-    df_rp = pd.DataFrame(historico_rp)
-    df_rp["datetime"] = pd.to_datetime(df_rp["datetime"])
-    df_rp = df_rp.sort_values(by="datetime", ascending=True)
-
-    if "renewablePercentage" not in df_rp.columns:
+    frame = fetch_power_breakdown_frame(zone="PT")
+    if frame is None or not frame.has("renewablePercentage"):
         return None
 
     # Take the last 24 hours of data
-    df_rp = df_rp[["datetime", "renewablePercentage"]].tail(24).reset_index(drop=True)
-    df_rp.rename(columns={"renewablePercentage": "Renewable Percentage"}, inplace=True)
+    df_rp = frame.to_pandas({"renewablePercentage": "Renewable Percentage"})
+    df_rp = df_rp.tail(24).reset_index(drop=True)
 
     return df_rp
 
@@ -1,34 +1,21 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 import numpy as np
 from datetime import datetime, timedelta, timezone
-from backend.api import fetch_power_breakdown_history
+from backend.api import fetch_power_breakdown_frame
 
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_renewable_percentage_data():
     """Cache the renewable percentage data fetching and processing"""
     now_dt = datetime.now(timezone.utc)
-    data_rp = fetch_power_breakdown_history(zone="PT")
+    frame = fetch_power_breakdown_frame(zone="PT")
 
-    if not data_rp or not data_rp.get("history"):
-        return None, None
-
-    historico_rp = data_rp.get("history", [])
-    if not historico_rp:
-        return None, None
-
-    df_rp = pd.DataFrame(historico_rp)
-    df_rp["datetime"] = pd.to_datetime(df_rp["datetime"])
-    df_rp = df_rp.sort_values(by="datetime", ascending=True)
-
-    if "renewablePercentage" not in df_rp.columns:
+    if frame is None or not frame.has("renewablePercentage"):
         return None, None
 
     # Select and rename columns
-    df_rp = df_rp[["datetime", "renewablePercentage"]].copy()
-    df_rp.rename(columns={"renewablePercentage": "RP"}, inplace=True)
+    df_rp = frame.to_pandas({"renewablePercentage": "RP"})
 
     # Filter to the last 24 hours
     cutoff_rp = now_dt - timedelta(hours=24)
@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend import aggregation
+from backend.aggregation import RANGES, aggregate_windows, breakdown_window, snapshot_end
+from backend.history_frame import BREAKDOWNS, build_history_frame
+
+END = datetime(2025, 5, 2, tzinfo=timezone.utc)
+
+
+def _payload(seed: int = 3) -> dict:
+    """24 hours of power breakdowns with null values, missing totals and a source that appears late."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(24):
+        ts = END - timedelta(hours=24 - i)
+        row = {"zone": "PT", "datetime": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+        for field, total in BREAKDOWNS.values():
+            sources = ["solar", "wind", "hydro", "gas"] if "Import" not in field and "Export" not in field else ["ES"]
+            if i > 18:
+                sources.append("FR")
+            row[field] = {
+                source: None
+                if rng.random() < 0.1
+                else rng.choice([rng.randint(0, 3000), round(rng.uniform(0, 3000), 1)])
+                for source in sources
+            }
+            if rng.random() > 0.1:
+                row[total] = rng.randint(0, 9000)
+        rows.append(row)
+    return {"zone": "PT", "history": rows}
+
+
+def _loop_window(history, key, time_hours, now):
+    """The per-window loop the dashboard used before the prefix sums."""
+    field, total_field = BREAKDOWNS[key]
+    limite = now - timedelta(hours=time_hours)
+    breakdown_total = {}
+    total_sum = 0
+    for registro in history:
+        dt = datetime.fromisoformat(registro["datetime"].replace("Z", "+00:00"))
+        if dt < limite or dt > now:
+            continue
+        for source, val in registro.get(field, {}).items():
+            breakdown_total[source] = breakdown_total.get(source, 0) + (val if val is not None else 0)
+        val_total = registro.get(total_field, 0)
+        total_sum += val_total if val_total is not None else 0
+    return breakdown_total, total_sum
+
+
+@pytest.fixture
+def payload():
+    return _payload()
+
+
+@pytest.mark.parametrize("minutes", [0, 1, 37, 59])
+@pytest.mark.parametrize("hours", list(RANGES) + [2, 5, 48])
+def test_windows_match_the_per_window_loops(payload, hours, minutes):
+    frame = build_history_frame(payload)
+    now = END + timedelta(minutes=minutes)
+    for key in BREAKDOWNS:
+        expected = _loop_window(payload["history"], key, hours, now)
+        totals, total = breakdown_window(frame, key, hours, now)
+        assert totals == pytest.approx(expected[0])
+        assert list(totals) == [source for source in frame.breakdowns[key].sources if source in totals]
+        assert total == pytest.approx(expected[1])
+
+
+def test_ranges_end_at_the_snapshot_and_cover_whole_hours(payload):
+    frame = build_history_frame(payload)
+    assert snapshot_end(frame) == END
+    windows = aggregate_windows(frame, snapshot_end(frame))
+    for hours in RANGES:
+        # The newest `hours` rows, whatever the minute the page was loaded
+        rows = payload["history"][-hours:]
+        assert windows[hours]["production"][1] == sum(row.get("powerProductionTotal") or 0 for row in rows)
+
+
+def test_empty_frames_give_empty_windows():
+    assert breakdown_window(None, "import", 24, END) == ({}, 0)
+    assert breakdown_window(build_history_frame(_payload()), "unknown", 24, END) == ({}, 0)
+
+
+def test_windows_are_reused_for_the_same_frame_object(payload, monkeypatch):
+    monkeypatch.setattr(aggregation, "_last", (None, None, {}))
+    frame = build_history_frame(payload)
+    first = aggregate_windows(frame, END)
+    assert aggregate_windows(frame, END) is first
+    later = aggregate_windows(frame, END + timedelta(hours=1))
+    assert later is not first
+    # An equal but newly parsed frame (a new refresh) is aggregated again
+    assert aggregate_windows(build_history_frame(payload), END + timedelta(hours=1)) is not later
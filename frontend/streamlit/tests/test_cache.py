@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from backend import cache
+from backend.cache import MemoryCache, SQLiteCache, derived, shared_cache
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "fetch_cache.sqlite3"), lease=2.0, poll=0.01)
+
+
+def test_value_is_shared_between_cache_instances_on_one_file(sqlite_cache):
+    other = SQLiteCache(sqlite_cache.path)
+    assert sqlite_cache.get_or_load("key", 60, lambda: {"a": 1}) == {"a": 1}
+    assert other.get_or_load("key", 60, lambda: pytest.fail("should be cached")) == {"a": 1}
+
+
+def test_failed_refresh_keeps_serving_the_last_good_value(sqlite_cache):
+    sqlite_cache.get_or_load("key", 0, lambda: {"a": 1})
+    assert sqlite_cache.get_or_load("key", 60, lambda: {}) == {"a": 1}
+    # The retry is pushed back by a full ttl, not attempted on every call
+    _, expires = sqlite_cache.stamp("key")
+    assert expires > time.time() + 30
+    assert sqlite_cache.get_or_load("key", 60, lambda: pytest.fail("should be cached")) == {"a": 1}
+
+
+def test_lease_lets_one_process_refresh_while_others_serve_the_old_value(sqlite_cache):
+    other = SQLiteCache(sqlite_cache.path, lease=2.0, poll=0.01)
+    sqlite_cache.get_or_load("key", 0, lambda: {"v": "old"})
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append("slow")
+        started.set()
+        release.wait(5)
+        return {"v": "new"}
+
+    refresher = threading.Thread(target=sqlite_cache.get_or_load, args=("key", 60, slow))
+    refresher.start()
+    started.wait(5)
+    try:
+        assert other.get_or_load("key", 60, lambda: calls.append("other") or {"v": "x"}) == {"v": "old"}
+    finally:
+        release.set()
+        refresher.join(5)
+    assert calls == ["slow"]
+    assert other.get_or_load("key", 60, lambda: pytest.fail("should be cached")) == {"v": "new"}
+
+
+def test_cold_start_waits_for_the_lease_holder(sqlite_cache):
+    other = SQLiteCache(sqlite_cache.path, lease=2.0, poll=0.01)
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return {"v": 1}
+
+    refresher = threading.Thread(target=sqlite_cache.get_or_load, args=("key", 60, slow))
+    refresher.start()
+    started.wait(5)
+    assert other.get_or_load("key", 60, lambda: pytest.fail("must wait, not load")) == {"v": 1}
+    refresher.join(5)
+
+
+def test_memory_cache_falls_back_to_the_last_good_value():
+    memory = MemoryCache()
+    memory.get_or_load("key", 0, lambda: {"a": 1})
+    assert memory.get_or_load("key", 60, lambda: {}) == {"a": 1}
+
+
+
+@pytest.fixture
+def backend(sqlite_cache, monkeypatch):
+    monkeypatch.setattr(cache, "_backend", sqlite_cache)
+    monkeypatch.setattr(cache, "_derived", {})
+    return sqlite_cache
+
+
+def test_derived_value_is_rebuilt_only_when_the_entry_changes(backend):
+    payloads = iter([{"n": 1}, {"n": 2}])
+    transforms = []
+
+    @shared_cache(ttl=60)
+    def fetch(zone):
+        return next(payloads)
+
+    def parse(value):
+        transforms.append(value)
+        return value["n"] * 10
+
+    assert derived(fetch, parse, "PT") == 10
+    assert derived(fetch, parse, "PT") == 10
+    assert transforms == [{"n": 1}]
+    backend._execute("UPDATE entries SET expires = 0")
+    assert derived(fetch, parse, "PT") == 20
+    assert transforms == [{"n": 1}, {"n": 2}]
+
+
+def test_derived_value_survives_a_failed_refresh(backend):
+    payloads = iter([{"n": 1}, {}])
+
+    @shared_cache(ttl=60)
+    def fetch(zone):
+        return next(payloads)
+
+    def parse(value):
+        return [value["n"]]
+
+    first = derived(fetch, parse, "PT")
+    backend._execute("UPDATE entries SET expires = 0")
+    # The refresh failed, so the same parsed object is served again
+    assert derived(fetch, parse, "PT") is first
@@ -0,0 +1,48 @@
+import numpy as np
+
+from backend.history_frame import build_history_frame
+
+
+def _row(hour: int, **fields) -> dict:
+    return {"zone": "PT", "datetime": f"2025-05-01T{hour:02d}:00:00.000Z", **fields}
+
+
+def test_rows_are_sorted_and_deduplicated_later_copy_wins():
+    frame = build_history_frame(
+        {
+            "zone": "PT",
+            "history": [
+                _row(2, renewablePercentage=30),
+                _row(0, renewablePercentage=10),
+                _row(1, renewablePercentage=20),
+                _row(1, renewablePercentage=21),
+            ],
+        }
+    )
+    assert len(frame) == 3
+    assert np.all(np.diff(frame.times) == 3600)
+    np.testing.assert_array_equal(frame.series["renewablePercentage"], [10, 21, 30])
+    assert list(frame.to_pandas({"renewablePercentage": "value"}).columns) == ["datetime", "value"]
+
+
+def test_breakdowns_become_matrices_with_nan_for_missing_values():
+    frame = build_history_frame(
+        {
+            "history": [
+                _row(0, powerImportBreakdown={"ES": 100, "FR": None}, powerImportTotal=100),
+                _row(1, powerImportBreakdown={"ES": 50}, powerImportTotal=None),
+            ]
+        }
+    )
+    imports = frame.breakdowns["import"]
+    assert imports.sources == ("ES", "FR")
+    np.testing.assert_array_equal(imports.values, [[100, np.nan], [50, np.nan]])
+    np.testing.assert_array_equal(imports.present, [[True, True], [True, False]])
+    np.testing.assert_array_equal(imports.total, [100, np.nan])
+    assert "export" not in frame.breakdowns
+
+
+def test_empty_payloads_give_no_frame():
+    assert build_history_frame({}) is None
+    assert build_history_frame({"history": []}) is None
+    assert build_history_frame(None) is None
@@ -0,0 +1,34 @@
+"""Shared ElectricityMap v3 client used by the CI_RP API and the Streamlit dashboard."""
+from electricitymap.client import (
+    DEFAULT_BASE_URL,
+    AsyncElectricityMapClient,
+    CallStats,
+    ElectricityMapClient,
+    ElectricityMapError,
+)
+from electricitymap.ingest import AsyncIncrementalHistory, IncrementalHistory, RingBuffer
+from electricitymap.records import (
+    CarbonIntensityRecord,
+    History,
+    PowerBreakdownRecord,
+    parse_datetime,
+)
+from electricitymap.replay import Cassette
+from electricitymap.store import HistoryStore
+
+__all__ = [
+    "DEFAULT_BASE_URL",
+    "AsyncElectricityMapClient",
+    "AsyncIncrementalHistory",
+    "CallStats",
+    "Cassette",
+    "CarbonIntensityRecord",
+    "ElectricityMapClient",
+    "ElectricityMapError",
+    "History",
+    "HistoryStore",
+    "IncrementalHistory",
+    "PowerBreakdownRecord",
+    "RingBuffer",
+    "parse_datetime",
+]
@@ -0,0 +1,316 @@
+"""
+Parallel historical backfill from ``/past-range`` into local Parquet partitions.
+
+    python -m electricitymap.backfill --zone PT --start 2021-01-01 --end 2025-01-01 \\
+        --signal carbon-intensity --signal power-breakdown --out data/backfill
+
+The range is split into UTC days. Days still missing are grouped into
+requests of up to ``--chunk-days`` (the upstream allows 10), fetched
+``--concurrency`` at a time under a ``--rate`` requests/second token
+bucket. Each day becomes one partition,
+``<out>/<signal>/<zone>/<year>/<day>.parquet``, deduplicated on
+``datetime`` and written atomically. ``manifest.json`` next to the
+partitions keeps each one's SHA-256 and row count. A rerun skips days
+whose partition is complete and still matches its checksum, so an
+interrupted backfill resumes where it stopped; days that were not over
+yet are fetched again. Set ``--base-url`` to the load-test stub
+(``backend/api/CI_RP/loadtest/stub.py``) to run offline.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import fields
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from electricitymap.client import PAST_RANGE_MAX, AsyncElectricityMapClient, ElectricityMapError
+from electricitymap.records import RECORD_TYPES
+
+try:
+    import pandas as pd
+except ImportError as e:  # pragma: no cover - optional extra
+    raise ImportError(
+        "The backfill needs pandas and pyarrow (pip install 'electricitymap-client[backfill]')"
+    ) from e
+
+DAY = timedelta(days=1)
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second, in bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def days(start: date, end: date) -> List[date]:
+    """UTC days in [start, end)."""
+    return [start + DAY * i for i in range((end - start).days)]
+
+
+def chunks(pending: List[date], chunk_days: int) -> List[List[date]]:
+    """Group days into runs of consecutive days, each at most ``chunk_days`` long."""
+    groups: List[List[date]] = []
+    for day in sorted(pending):
+        if groups and len(groups[-1]) < chunk_days and groups[-1][-1] + DAY == day:
+            groups[-1].append(day)
+        else:
+            groups.append([day])
+    return groups
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def frame(records) -> "pd.DataFrame":
+    """
+    One row per hour, oldest first: scalar record fields as columns, each
+    breakdown flattened to ``<field>.<source>`` columns. When an hour appears
+    more than once, the copy with the latest ``updated_at`` wins.
+    """
+    rows = []
+    for record in records:
+        row = {}
+        for field in fields(record):
+            value = getattr(record, field.name)
+            if isinstance(value, dict):
+                row.update({f"{field.name}.{source}": amount for source, amount in value.items()})
+            else:
+                row[field.name] = value
+        rows.append(row)
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    for column in df.columns:
+        if column in ("datetime", "updated_at"):
+            df[column] = pd.to_datetime(df[column], utc=True)
+        elif column == "is_estimated":
+            df[column] = df[column].astype("boolean")
+        elif column != "zone":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    df = df.sort_values(["datetime", "updated_at"], na_position="first", kind="stable")
+    df = df.drop_duplicates("datetime", keep="last").reset_index(drop=True)
+    # Stable column order, so the same hours always give the same bytes
+    return df[sorted(df.columns, key=lambda c: (c not in ("datetime", "zone"), c))]
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Dataset:
+    """Partitions and manifest of one signal and zone under the output directory."""
+
+    def __init__(self, root: str, signal: str, zone: str):
+        self.signal = signal
+        self.zone = zone
+        self.directory = os.path.join(root, signal, zone)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.partitions: Dict[str, dict] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.partitions = json.load(f)["partitions"]
+
+    def path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{day.year}", f"{day.isoformat()}.parquet")
+
+    def is_done(self, day: date) -> bool:
+        """True for a complete day whose partition (if it had rows) matches its checksum."""
+        entry = self.partitions.get(day.isoformat())
+        if entry is None or not entry["complete"]:
+            return False
+        if entry["rows"] == 0:
+            return True
+        path = self.path(day)
+        return os.path.exists(path) and _sha256(path) == entry["sha256"]
+
+    def write(self, day: date, df: "pd.DataFrame", complete: bool) -> Tuple[dict, bool]:
+        """
+        Atomically write one day's partition; returns its manifest entry and
+        False if the bytes were unchanged. ``partitions`` is left alone, so
+        this can run on worker threads while the event loop saves the
+        manifest; the caller records the entry.
+        """
+        entry = {"rows": len(df), "sha256": None, "complete": complete}
+        changed = True
+        if len(df):
+            path = self.path(day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            df.to_parquet(tmp, index=False, compression="zstd")
+            entry["sha256"] = _sha256(tmp)
+            if os.path.exists(path) and _sha256(path) == entry["sha256"]:
+                os.remove(tmp)
+                changed = False
+            else:
+                os.replace(tmp, path)
+        return entry, changed
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {"signal": self.signal, "zone": self.zone, "partitions": dict(sorted(self.partitions.items()))},
+                f,
+                indent=1,
+            )
+        os.replace(tmp, self.manifest_path)
+
+
+def load(
+    root: str, signal: str, zone: str, start: Optional[date] = None, end: Optional[date] = None
+) -> "pd.DataFrame":
+    """Read one signal and zone back as a single frame, reading only partitions in [start, end)."""
+    dataset = Dataset(root, signal, zone)
+    frames = [
+        pd.read_parquet(dataset.path(date.fromisoformat(day)))
+        for day, entry in sorted(dataset.partitions.items())
+        if entry["rows"]
+        and (start is None or day >= start.isoformat())
+        and (end is None or day < end.isoformat())
+    ]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+async def _fetch_chunk(client, limiter, semaphore, dataset: Dataset, chunk: List[date], now: datetime) -> dict:
+    start = _midnight(chunk[0])
+    end = min(_midnight(chunk[-1]) + DAY, now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+    async with semaphore:
+        await limiter.acquire()
+        try:
+            history = await client.past_range(dataset.signal, dataset.zone, start, end)
+        except ElectricityMapError as e:
+            print(f"{dataset.signal} {dataset.zone} {chunk[0]}..{chunk[-1]}: failed ({e})", file=sys.stderr)
+            return {"failed": len(chunk)}
+    by_day: Dict[date, list] = {day: [] for day in chunk}
+    for record in history.records:
+        day = record.datetime.astimezone(timezone.utc).date()
+        if day in by_day:
+            by_day[day].append(record)
+    loop = asyncio.get_running_loop()
+    written = unchanged = rows = 0
+    for day, records in by_day.items():
+        df = frame(records)
+        complete = _midnight(day) + DAY <= now
+        entry, changed = await loop.run_in_executor(None, dataset.write, day, df, complete)
+        # The manifest is only changed here, on the event loop, so save() never races a write
+        dataset.partitions[day.isoformat()] = entry
+        written += changed
+        unchanged += not changed
+        rows += len(df)
+    dataset.save()
+    print(f"{dataset.signal} {dataset.zone} {chunk[0]}..{chunk[-1]}: {rows} rows, {written} partitions written")
+    return {"written": written, "unchanged": unchanged, "rows": rows}
+
+
+async def backfill(
+    client: AsyncElectricityMapClient,
+    root: str,
+    signals: List[str],
+    zones: List[str],
+    start: date,
+    end: date,
+    concurrency: int = 4,
+    rate: float = 2.0,
+    chunk_days: int = 10,
+    force: bool = False,
+) -> dict:
+    """Fetch every missing day of [start, end) for each signal and zone; returns totals."""
+    if not 0 < chunk_days <= PAST_RANGE_MAX.days:
+        raise ValueError(f"chunk_days must be between 1 and {PAST_RANGE_MAX.days}")
+    now = datetime.now(timezone.utc)
+    end = min(end, now.date() + DAY)
+    limiter = RateLimiter(rate, burst=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    totals = {"days": 0, "skipped": 0, "written": 0, "unchanged": 0, "rows": 0, "failed": 0}
+    tasks = []
+    for signal in signals:
+        if signal not in RECORD_TYPES:
+            raise ValueError(f"Unknown signal {signal!r}")
+        for zone in zones:
+            dataset = Dataset(root, signal, zone)
+            wanted = days(start, end)
+            pending = [day for day in wanted if force or not dataset.is_done(day)]
+            totals["days"] += len(wanted)
+            totals["skipped"] += len(wanted) - len(pending)
+            tasks += [
+                _fetch_chunk(client, limiter, semaphore, dataset, chunk, now)
+                for chunk in chunks(pending, chunk_days)
+            ]
+    for result in await asyncio.gather(*tasks):
+        for key, value in result.items():
+            totals[key] += value
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--signal", action="append", choices=sorted(RECORD_TYPES), help="repeatable; default: all")
+    parser.add_argument("--zone", action="append", help="repeatable; default: ELECTRICITYMAP_REGION or PT")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first UTC day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, help="UTC day after the last one (default: tomorrow)")
+    parser.add_argument("--out", default="data/backfill", help="output directory")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="max requests per second")
+    parser.add_argument("--chunk-days", type=int, default=PAST_RANGE_MAX.days)
+    parser.add_argument("--base-url", help="default: ELECTRICITYMAP_BASE_URL or the public API")
+    parser.add_argument("--force", action="store_true", help="refetch days that are already complete")
+    args = parser.parse_args(argv)
+
+    overrides = {"max_connections": args.concurrency}
+    if args.base_url:
+        overrides["base_url"] = args.base_url
+
+    async def run():
+        client = AsyncElectricityMapClient.from_env(**overrides)
+        try:
+            return await backfill(
+                client,
+                args.out,
+                args.signal or sorted(RECORD_TYPES),
+                args.zone or [os.getenv("ELECTRICITYMAP_REGION", "PT")],
+                args.start,
+                args.end or datetime.now(timezone.utc).date() + DAY,
+                args.concurrency,
+                args.rate,
+                args.chunk_days,
+                args.force,
+            ), client.stats()
+        finally:
+            await client.aclose()
+
+    started = time.perf_counter()
+    totals, stats = asyncio.run(run())
+    print(json.dumps({"seconds": round(time.perf_counter() - started, 2), **totals, "upstream": stats}, indent=1))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Pooled ElectricityMap v3 clients.
+
+``ElectricityMapClient`` (requests) and ``AsyncElectricityMapClient``
+(httpx) keep keep-alive connections open across calls, retry timeouts,
+connection errors and 429/5xx responses with exponential backoff, and
+decode each response once into typed records. A ``Retry-After`` longer
+than the request timeout is not waited out: the 429/503 is raised at once,
+so a rate-limited caller can fall back instead of stalling. Every call is timed; the
+totals are available from ``stats()`` and each call's ``CallStats`` can be
+forwarded to the caller's own metrics with ``on_call``. A ``Cassette``
+records raw responses or replays them offline (``electricitymap.replay``).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from electricitymap.records import RECORD_TYPES, History
+from electricitymap.replay import Cassette
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only the async client needs it
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.electricitymap.org/v3"
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+SIGNALS = tuple(RECORD_TYPES)
+KINDS = ("history", "latest", "past-range")
+# Longest span one past-range call may cover (hourly granularity)
+PAST_RANGE_MAX = timedelta(days=10)
+
+
+class ElectricityMapError(Exception):
+    """
+    A failed upstream call. ``reason`` is ``"http"`` (see ``status``),
+    ``"timeout"``, ``"transport"``, ``"decode"`` or ``"replay"`` (nothing
+    recorded for the call in replay mode).
+    """
+
+    def __init__(self, message: str, reason: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+
+
+@dataclass(frozen=True)
+class CallStats:
+    signal: str
+    kind: str
+    zone: str
+    duration: float
+    attempts: int
+    bytes: int = 0
+    status: Optional[int] = None
+    # ElectricityMapError.reason for failed calls
+    error: Optional[str] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.signal}/{self.kind}"
+
+
+class _BaseClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_connections: int = 10,
+        on_call: Optional[Callable[[CallStats], None]] = None,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.on_call = on_call
+        # Record/replay of raw responses (see electricitymap.replay)
+        self.cassette = cassette
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Build a client from the ELECTRICITYMAP_* variables the services already use."""
+        settings = {
+            "api_key": os.getenv("ELECTRICITYMAP_API_KEY"),
+            "base_url": os.getenv("ELECTRICITYMAP_BASE_URL") or DEFAULT_BASE_URL,
+            "timeout": float(os.getenv("ELECTRICITYMAP_TIMEOUT", "10")),
+            "retries": int(os.getenv("ELECTRICITYMAP_RETRIES", "2")),
+            "max_connections": int(os.getenv("ELECTRICITYMAP_MAX_CONNECTIONS", "10")),
+            "cassette": Cassette.from_env(),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def headers(self) -> dict:
+        return {"auth-token": self.api_key} if self.api_key else {}
+
+    def _url(self, signal: str, kind: str) -> str:
+        if signal not in SIGNALS or kind not in KINDS:
+            raise ValueError(f"Unknown endpoint {signal}/{kind}")
+        return f"{self.base_url}/{signal}/{kind}"
+
+    def _record_call(self, stats: CallStats) -> None:
+        with self._stats_lock:
+            totals = self._stats.setdefault(
+                stats.endpoint, {"calls": 0, "errors": 0, "retries": 0, "seconds": 0.0, "bytes": 0}
+            )
+            totals["calls"] += 1
+            totals["errors"] += stats.error is not None
+            totals["retries"] += stats.attempts - 1
+            totals["seconds"] += stats.duration
+            totals["bytes"] += stats.bytes
+        if self.on_call is not None:
+            try:
+                self.on_call(stats)
+            except Exception:
+                logger.exception("ElectricityMap on_call hook failed")
+
+    @property
+    def replaying(self) -> bool:
+        return self.cassette is not None and self.cassette.replaying
+
+    def _replay(self, signal: str, kind: str, zone: str, params: dict, start: float) -> dict:
+        body = self.cassette.load(signal, kind, zone, params)
+        if body is None:
+            self._record_call(CallStats(signal, kind, zone, time.perf_counter() - start, 1, error="replay"))
+            raise ElectricityMapError(f"No recorded response for {signal}/{kind} in zone {zone}", "replay")
+        self._record_call(CallStats(signal, kind, zone, time.perf_counter() - start, 1, len(body), 200))
+        return json.loads(body)
+
+    def _record(self, signal: str, kind: str, zone: str, params: dict, body: bytes) -> None:
+        if self.cassette is None or not self.cassette.recording:
+            return
+        try:
+            self.cassette.save(signal, kind, zone, params, body)
+        except OSError:
+            logger.exception("Recording the %s/%s response failed", signal, kind)
+
+    def stats(self) -> dict:
+        """Totals per endpoint: calls, errors, retries, seconds and bytes."""
+        with self._stats_lock:
+            return {endpoint: dict(totals) for endpoint, totals in self._stats.items()}
+
+    @staticmethod
+    def _decode(signal: str, kind: str, zone: str, data: dict):
+        if kind == "latest":
+            return RECORD_TYPES[signal].from_json(data, zone)
+        return History.from_json(signal, zone, data)
+
+    @staticmethod
+    def _range_params(start: datetime, end: datetime) -> dict:
+        if end <= start or end - start > PAST_RANGE_MAX:
+            raise ValueError(f"past-range spans must be positive and at most {PAST_RANGE_MAX}")
+        return {"start": _isoformat(start), "end": _isoformat(end)}
+
+
+class _BoundedRetry(Retry):
+    """urllib3 ``Retry`` that gives up on a ``Retry-After`` longer than ``max_retry_after`` seconds."""
+
+    max_retry_after: Optional[float] = None
+
+    def new(self, **kwargs) -> "_BoundedRetry":
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.max_retry_after is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # With raise_on_status=False the pool hands back the response as is
+                raise MaxRetryError(_pool, url, f"Retry-After {retry_after:.0f}s is too long")
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _isoformat(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class ElectricityMapClient(_BaseClient):
+    """
+    Blocking client over one pooled ``requests.Session``; safe to share
+    between threads for GET requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._session_lock:
+            if self._session is None:
+                retry = _BoundedRetry(
+                    total=self.retries,
+                    backoff_factor=self.backoff,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET"}),
+                    raise_on_status=False,
+                    respect_retry_after_header=True,
+                )
+                retry.max_retry_after = self.timeout
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.max_connections, max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(self.headers)
+                self._session = session
+            return self._session
+
+    def request(self, signal: str, kind: str, zone: str, **params) -> dict:
+        """GET one endpoint for a zone (plus any extra query ``params``) and return its decoded JSON body."""
+        url = self._url(signal, kind)
+        start = time.perf_counter()
+        if self.replaying:
+            time.sleep(self.cassette.latency)
+            return self._replay(signal, kind, zone, params, start)
+        status, size, attempts = None, 0, 1
+        try:
+            try:
+                resp = self.session.get(url, params={"zone": zone, **params}, timeout=self.timeout)
+            except requests.Timeout as e:
+                raise ElectricityMapError(str(e), "timeout") from e
+            except requests.ConnectionError as e:
+                reason = getattr(e.args[0], "reason", None) if e.args else None
+                timed_out = isinstance(reason, (ConnectTimeoutError, ReadTimeoutError))
+                raise ElectricityMapError(str(e), "timeout" if timed_out else "transport") from e
+            except requests.RequestException as e:
+                raise ElectricityMapError(str(e), "transport") from e
+            status, size = resp.status_code, len(resp.content)
+            retries = getattr(resp.raw, "retries", None)
+            attempts += len(retries.history) if retries is not None else 0
+            if status >= 400:
+                raise ElectricityMapError(
+                    f"{status} from {signal}/{kind} for zone {zone}", "http", status
+                )
+            try:
+                data = resp.json()
+            except ValueError as e:
+                raise ElectricityMapError(f"Invalid JSON from {signal}/{kind}", "decode", status) from e
+        except ElectricityMapError as e:
+            self._record_call(
+                CallStats(signal, kind, zone, time.perf_counter() - start, attempts, size, status, e.reason)
+            )
+            raise
+        self._record_call(CallStats(signal, kind, zone, time.perf_counter() - start, attempts, size, status))
+        self._record(signal, kind, zone, params, resp.content)
+        return data
+
+    def history(self, signal: str, zone: str) -> History:
+        return self._decode(signal, "history", zone, self.request(signal, "history", zone))
+
+    def latest(self, signal: str, zone: str):
+        return self._decode(signal, "latest", zone, self.request(signal, "latest", zone))
+
+    def past_range(self, signal: str, zone: str, start: datetime, end: datetime) -> History:
+        """Hourly records in [start, end), at most ``PAST_RANGE_MAX`` apart."""
+        params = self._range_params(start, end)
+        return self._decode(signal, "past-range", zone, self.request(signal, "past-range", zone, **params))
+
+    def carbon_intensity_history(self, zone: str) -> History:
+        return self.history("carbon-intensity", zone)
+
+    def power_breakdown_history(self, zone: str) -> History:
+        return self.history("power-breakdown", zone)
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncElectricityMapClient(_BaseClient):
+    """Asyncio client over one pooled ``httpx.AsyncClient``; create and use it on one event loop."""
+
+    def __init__(self, *args, **kwargs):
+        if httpx is None:
+            raise ImportError("AsyncElectricityMapClient needs httpx (pip install httpx)")
+        super().__init__(*args, **kwargs)
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def _delay(self, attempt: int, resp=None) -> Optional[float]:
+        """Seconds before the next attempt; None if ``Retry-After`` asks for longer than ``timeout``."""
+        retry_after = resp.headers.get("retry-after") if resp is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= self.timeout else None
+        return min(self.backoff * (2 ** (attempt - 1)), self.timeout)
+
+    async def request(self, signal: str, kind: str, zone: str, **params) -> dict:
+        """GET one endpoint for a zone (plus any extra query ``params``) and return its decoded JSON body."""
+        url = self._url(signal, kind)
+        start = time.perf_counter()
+        if self.replaying:
+            await asyncio.sleep(self.cassette.latency)
+            return self._replay(signal, kind, zone, params, start)
+        status, size, attempts = None, 0, 0
+        try:
+            while True:
+                attempts += 1
+                last = attempts > self.retries
+                try:
+                    resp = await self.client.get(url, params={"zone": zone, **params})
+                except httpx.TimeoutException as e:
+                    if last:
+                        raise ElectricityMapError(str(e) or "timed out", "timeout") from e
+                    await asyncio.sleep(self._delay(attempts))
+                    continue
+                except httpx.HTTPError as e:
+                    if last:
+                        raise ElectricityMapError(str(e), "transport") from e
+                    await asyncio.sleep(self._delay(attempts))
+                    continue
+                status, size = resp.status_code, len(resp.content)
+                delay = self._delay(attempts, resp) if status in RETRY_STATUSES and not last else None
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+            if status >= 400:
+                raise ElectricityMapError(
+                    f"{status} from {signal}/{kind} for zone {zone}", "http", status
+                )
+            try:
+                data = resp.json()
+            except ValueError as e:
+                raise ElectricityMapError(f"Invalid JSON from {signal}/{kind}", "decode", status) from e
+        except ElectricityMapError as e:
+            self._record_call(
+                CallStats(signal, kind, zone, time.perf_counter() - start, attempts, size, status, e.reason)
+            )
+            raise
+        self._record_call(CallStats(signal, kind, zone, time.perf_counter() - start, attempts, size, status))
+        self._record(signal, kind, zone, params, resp.content)
+        return data
+
+    async def history(self, signal: str, zone: str) -> History:
+        return self._decode(signal, "history", zone, await self.request(signal, "history", zone))
+
+    async def latest(self, signal: str, zone: str):
+        return self._decode(signal, "latest", zone, await self.request(signal, "latest", zone))
+
+    async def past_range(self, signal: str, zone: str, start: datetime, end: datetime) -> History:
+        """Hourly records in [start, end), at most ``PAST_RANGE_MAX`` apart."""
+        params = self._range_params(start, end)
+        data = await self.request(signal, "past-range", zone, **params)
+        return self._decode(signal, "past-range", zone, data)
+
+    async def carbon_intensity_history(self, zone: str) -> History:
+        return await self.history("carbon-intensity", zone)
+
+    async def power_breakdown_history(self, zone: str) -> History:
+        return await self.history("power-breakdown", zone)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,170 @@
+"""
+Incremental ingestion: seed once from ``/history``, then poll ``/latest``.
+
+Only the newest hourly point of a 24-hour history can change between
+polls, so after the first download each refresh fetches one record
+instead of 24. Points are merged into a fixed-size ring buffer per signal
+and zone, deduplicated on ``datetime`` (a newer copy of an hour, e.g. once
+an estimate is finalised, replaces the older one). Gaps, such as a
+consumer that slept for a few hours, and a periodic ``reseed_every`` fall
+back to a full ``/history`` download.
+"""
+import threading
+import time
+from array import array
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from electricitymap.records import RECORD_TYPES
+
+HOUR = timedelta(hours=1)
+
+
+def _epoch(record) -> int:
+    return int(record.datetime.timestamp())
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of (record, raw JSON row) pairs ordered by datetime.
+
+    Timestamps live in a preallocated ``array('q')`` next to the item slots,
+    so appends, dedupe lookups and in-order reads never reallocate.
+    """
+
+    def __init__(self, capacity: int = 24):
+        self.capacity = capacity
+        self._ts = array("q", [0] * capacity)
+        self._items: List[Optional[Tuple]] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _slot(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    @property
+    def newest(self):
+        return self._items[self._slot(self._size - 1)][0] if self._size else None
+
+    def clear(self) -> None:
+        self._start = self._size = 0
+        self._items = [None] * self.capacity
+
+    def push(self, record, raw: dict) -> bool:
+        """Merge one point; returns False if it was older than everything kept."""
+        ts = _epoch(record)
+        if self._size == 0 or ts > self._ts[self._slot(self._size - 1)]:
+            if self._size < self.capacity:
+                slot = self._slot(self._size)
+                self._size += 1
+            else:
+                slot = self._start
+                self._start = self._slot(1)
+            self._ts[slot] = ts
+            self._items[slot] = (record, raw)
+            return True
+        for i in range(self._size - 1, -1, -1):
+            slot = self._slot(i)
+            if self._ts[slot] == ts:
+                self._items[slot] = (record, raw)
+                return True
+            if self._ts[slot] < ts:
+                break
+        # Rare out-of-order point: rebuild in order, keeping the newest ones
+        items = sorted(self.items() + [(record, raw)], key=lambda item: _epoch(item[0]))
+        if _epoch(items[0][0]) == ts and len(items) > self.capacity:
+            return False
+        self.extend(items, replace=True)
+        return True
+
+    def extend(self, items: Iterable[Tuple], replace: bool = False) -> None:
+        if replace:
+            self.clear()
+        for record, raw in items:
+            self.push(record, raw)
+
+    def items(self) -> List[Tuple]:
+        return [self._items[self._slot(i)] for i in range(self._size)]
+
+    def records(self) -> list:
+        return [record for record, _ in self.items()]
+
+    def rows(self) -> list:
+        return [raw for _, raw in self.items()]
+
+
+class _Incremental:
+    def __init__(self, client, signal: str, zone: str, capacity: int = 24, reseed_every: float = 6 * 3600):
+        if signal not in RECORD_TYPES:
+            raise ValueError(f"Unknown signal {signal!r}")
+        self.client = client
+        self.signal = signal
+        self.zone = zone
+        self.reseed_every = reseed_every
+        self.buffer = RingBuffer(capacity)
+        self.seeded_at: Optional[float] = None
+
+    def _needs_seed(self) -> bool:
+        return (
+            self.seeded_at is None
+            or not len(self.buffer)
+            or time.monotonic() - self.seeded_at >= self.reseed_every
+        )
+
+    def _seed(self, data: dict) -> None:
+        record_type = RECORD_TYPES[self.signal]
+        rows = data.get("history", [])
+        self.buffer.extend(
+            sorted(((record_type.from_json(row, self.zone), row) for row in rows), key=lambda x: x[0].datetime),
+            replace=True,
+        )
+        self.seeded_at = time.monotonic()
+
+    def _merge_latest(self, row: dict) -> bool:
+        """Merge a ``/latest`` point; False means hours are missing and a reseed is needed."""
+        record = RECORD_TYPES[self.signal].from_json(row, self.zone)
+        newest = self.buffer.newest
+        if newest is not None and record.datetime - newest.datetime > HOUR:
+            return False
+        self.buffer.push(record, row)
+        return True
+
+    def records(self) -> list:
+        """Typed records, oldest first."""
+        return self.buffer.records()
+
+    def raw(self) -> dict:
+        """The buffer in ``/history`` response shape, for consumers of the raw JSON."""
+        return {"zone": self.zone, "history": self.buffer.rows()}
+
+
+class IncrementalHistory(_Incremental):
+    """Rolling history for one signal and zone, kept fresh with ``ElectricityMapClient``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def refresh(self) -> list:
+        """Bring the buffer up to date (one ``/latest`` call when possible) and return its records."""
+        with self._lock:
+            if self._needs_seed() or not self._merge_latest(
+                self.client.request(self.signal, "latest", self.zone)
+            ):
+                self._seed(self.client.request(self.signal, "history", self.zone))
+            return self.records()
+
+
+class AsyncIncrementalHistory(_Incremental):
+    """Rolling history for one signal and zone, kept fresh with ``AsyncElectricityMapClient``."""
+
+    async def refresh(self) -> list:
+        """Bring the buffer up to date (one ``/latest`` call when possible) and return its records."""
+        if self._needs_seed() or not self._merge_latest(
+            await self.client.request(self.signal, "latest", self.zone)
+        ):
+            self._seed(await self.client.request(self.signal, "history", self.zone))
+        return self.records()
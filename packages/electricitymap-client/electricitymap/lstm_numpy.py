@@ -0,0 +1,105 @@
+"""
+Pure-NumPy inference for the exported Keras forecast models, shared by the
+CI_RP API and the Streamlit dashboard (``pip install ".[model]"``).
+
+The .npz files written by the API's ``python -m app.export_weights`` hold
+the layer stack as a JSON spec plus one array per weight. ``NumpyModel``
+replays that stack (LSTM, Dense, BatchNormalization; Dropout is a no-op at
+inference) so the serving path never has to import TensorFlow.
+"""
+import json
+
+import numpy as np
+
+
+def _sigmoid(x):
+    # tanh form avoids overflow in exp() for large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "softmax": _softmax,
+}
+
+
+def _lstm(x, layer, kernel, recurrent_kernel, bias):
+    """Run an LSTM over x of shape (batch, steps, features). Gate order is Keras' i, f, c, o."""
+    units = layer["units"]
+    act = ACTIVATIONS[layer["activation"]]
+    rec_act = ACTIVATIONS[layer["recurrent_activation"]]
+    batch, steps, _ = x.shape
+    # Input projections for every timestep in one matmul; only h @ U is sequential
+    xw = x @ kernel + bias
+    h = np.zeros((batch, units), dtype=x.dtype)
+    c = np.zeros((batch, units), dtype=x.dtype)
+    outputs = np.empty((batch, steps, units), dtype=x.dtype) if layer["return_sequences"] else None
+    for t in range(steps):
+        z = xw[:, t] + h @ recurrent_kernel
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units : 2 * units])
+        g = act(z[:, 2 * units : 3 * units])
+        o = rec_act(z[:, 3 * units :])
+        c = f * c + i * g
+        h = o * act(c)
+        if outputs is not None:
+            outputs[:, t] = h
+    return outputs if outputs is not None else h
+
+
+def _dense(x, layer, kernel, bias=None):
+    y = x @ kernel
+    if bias is not None:
+        y = y + bias
+    return ACTIVATIONS[layer["activation"]](y)
+
+
+def _batch_norm(x, layer, moving_mean, moving_variance, gamma=None, beta=None):
+    y = (x - moving_mean) / np.sqrt(moving_variance + layer["epsilon"])
+    if gamma is not None:
+        y = y * gamma
+    if beta is not None:
+        y = y + beta
+    return y
+
+
+LAYERS = {
+    "lstm": _lstm,
+    "dense": _dense,
+    "batch_normalization": _batch_norm,
+}
+
+
+class NumpyModel:
+    """Drop-in replacement for the subset of ``keras.Model`` the API uses (``predict``)."""
+
+    def __init__(self, layers: list, weights: dict, dtype=np.float32):
+        self.layers = layers
+        self.dtype = dtype
+        self.weights = [
+            {name: np.asarray(weights[f"{i}/{name}"], dtype=dtype) for name in layer["weights"]}
+            for i, layer in enumerate(layers)
+        ]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyModel":
+        with np.load(path) as data:
+            layers = json.loads(str(data["layers"]))
+            weights = {key: data[key] for key in data.files if key != "layers"}
+        return cls(layers, weights)
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        x = np.asarray(x, dtype=self.dtype)
+        for layer, weights in zip(self.layers, self.weights):
+            x = LAYERS[layer["type"]](x, layer, **weights)
+        return x
+
+    __call__ = predict
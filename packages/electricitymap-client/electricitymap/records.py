@@ -0,0 +1,100 @@
+"""Typed records decoded once from ElectricityMap JSON payloads."""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse ElectricityMap timestamps such as ``2025-05-01T13:00:00.000Z`` (UTC-aware)."""
+    if not value:
+        return None
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+@dataclass(frozen=True)
+class CarbonIntensityRecord:
+    zone: str
+    datetime: datetime
+    carbon_intensity: Optional[float]
+    is_estimated: Optional[bool] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_json(cls, data: dict, zone: str = None) -> "CarbonIntensityRecord":
+        return cls(
+            zone=data.get("zone", zone),
+            datetime=parse_datetime(data["datetime"]),
+            carbon_intensity=data.get("carbonIntensity"),
+            is_estimated=data.get("isEstimated"),
+            updated_at=parse_datetime(data.get("updatedAt")),
+        )
+
+
+@dataclass(frozen=True)
+class PowerBreakdownRecord:
+    zone: str
+    datetime: datetime
+    renewable_percentage: Optional[float]
+    fossil_free_percentage: Optional[float] = None
+    power_consumption_total: Optional[float] = None
+    power_production_total: Optional[float] = None
+    power_import_total: Optional[float] = None
+    power_export_total: Optional[float] = None
+    power_consumption_breakdown: Dict[str, Optional[float]] = field(default_factory=dict)
+    power_production_breakdown: Dict[str, Optional[float]] = field(default_factory=dict)
+    power_import_breakdown: Dict[str, Optional[float]] = field(default_factory=dict)
+    power_export_breakdown: Dict[str, Optional[float]] = field(default_factory=dict)
+    is_estimated: Optional[bool] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_json(cls, data: dict, zone: str = None) -> "PowerBreakdownRecord":
+        return cls(
+            zone=data.get("zone", zone),
+            datetime=parse_datetime(data["datetime"]),
+            renewable_percentage=data.get("renewablePercentage"),
+            fossil_free_percentage=data.get("fossilFreePercentage"),
+            power_consumption_total=data.get("powerConsumptionTotal"),
+            power_production_total=data.get("powerProductionTotal"),
+            power_import_total=data.get("powerImportTotal"),
+            power_export_total=data.get("powerExportTotal"),
+            power_consumption_breakdown=data.get("powerConsumptionBreakdown") or {},
+            power_production_breakdown=data.get("powerProductionBreakdown") or {},
+            power_import_breakdown=data.get("powerImportBreakdown") or {},
+            power_export_breakdown=data.get("powerExportBreakdown") or {},
+            is_estimated=data.get("isEstimated"),
+            updated_at=parse_datetime(data.get("updatedAt")),
+        )
+
+
+# Upstream signal (URL path segment) -> record type
+RECORD_TYPES = {
+    "carbon-intensity": CarbonIntensityRecord,
+    "power-breakdown": PowerBreakdownRecord,
+}
+
+
+def history_rows(data: dict) -> list:
+    """The record list of a ``/history`` (``history``) or ``/past-range`` (``data``) body."""
+    return data.get("history", data.get("data", []))
+
+
+@dataclass(frozen=True)
+class History:
+    """A decoded ``/history`` or ``/past-range`` response: typed records oldest first, plus the raw JSON."""
+
+    zone: str
+    signal: str
+    records: Tuple
+    raw: dict
+
+    @classmethod
+    def from_json(cls, signal: str, zone: str, data: dict) -> "History":
+        record_type = RECORD_TYPES[signal]
+        records = sorted(
+            (record_type.from_json(row, zone) for row in history_rows(data)),
+            key=lambda record: record.datetime,
+        )
+        return cls(zone=data.get("zone", zone), signal=signal, records=tuple(records), raw=data)
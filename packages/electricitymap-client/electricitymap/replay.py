@@ -0,0 +1,163 @@
+"""
+Record and replay raw upstream responses.
+
+With ``ELECTRICITYMAP_REPLAY=record`` every successful call also saves its
+response body, gzip-compressed, under ``ELECTRICITYMAP_REPLAY_DIR``. With
+``ELECTRICITYMAP_REPLAY=replay`` calls are served from those files and the
+network is never touched, optionally after ``ELECTRICITYMAP_REPLAY_LATENCY_MS``
+of simulated latency. ``history`` and ``latest`` bodies are keyed by
+endpoint, zone and UTC hour. A replay never looks at the wall clock: it
+keeps its own clock, which starts at ``ELECTRICITYMAP_REPLAY_START`` (an
+ISO hour) or else at the first hour recorded in the cassette, and serves
+the recording for that hour, or else the newest one before it, or else the
+oldest one. ``advance()`` steps the clock to the next recorded hour, so the
+recorded sequence plays back in order. Those rules depend only on the
+files and the start hour, so a replay of a given cassette is
+deterministic. ``past-range`` bodies are keyed by their query instead.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+MODES = ("record", "replay")
+HOUR_FORMAT = "%Y-%m-%dT%H"
+# Endpoints recorded per hour (past-range is keyed by its query)
+HOURLY_KINDS = ("history", "latest")
+
+
+def _hour(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class Cassette:
+    """A directory of recorded responses, ``<zone>/<signal>/<kind>/<key>.json.gz``."""
+
+    def __init__(
+        self, directory: str, mode: str, latency: float = 0.0, start: Optional[datetime] = None
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {MODES}")
+        self.directory = directory
+        self.mode = mode
+        # Simulated seconds per replayed call
+        self.latency = latency
+        # Replay clock; None until first read (then the first recorded hour)
+        self._clock: Optional[datetime] = _hour(start) if start is not None else None
+        self._bodies: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """The cassette selected by ELECTRICITYMAP_REPLAY, or None when it is unset/"off"."""
+        mode = os.getenv("ELECTRICITYMAP_REPLAY", "").lower()
+        if mode in ("", "off"):
+            return None
+        start = os.getenv("ELECTRICITYMAP_REPLAY_START")
+        return cls(
+            os.getenv("ELECTRICITYMAP_REPLAY_DIR", "data/replay"),
+            mode,
+            float(os.getenv("ELECTRICITYMAP_REPLAY_LATENCY_MS", "0")) / 1000,
+            datetime.fromisoformat(start) if start else None,
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def _folder(self, signal: str, kind: str, zone: str) -> str:
+        return os.path.join(self.directory, zone, signal, kind)
+
+    @staticmethod
+    def _key(params: dict, hour: datetime) -> str:
+        if params:
+            query = json.dumps(params, sort_keys=True, separators=(",", ":"))
+            return hashlib.sha256(query.encode()).hexdigest()[:16]
+        return hour.strftime(HOUR_FORMAT)
+
+    @staticmethod
+    def _keys(folder: str) -> List[str]:
+        try:
+            return sorted(name[: -len(".json.gz")] for name in os.listdir(folder) if name.endswith(".json.gz"))
+        except FileNotFoundError:
+            return []
+
+    def hours(self) -> List[datetime]:
+        """Every UTC hour with a recorded ``history`` or ``latest`` body, oldest first."""
+        hours = set()
+        for root, _, _ in os.walk(self.directory):
+            if os.path.basename(root) in HOURLY_KINDS:
+                hours.update(self._keys(root))
+        return [datetime.strptime(key, HOUR_FORMAT).replace(tzinfo=timezone.utc) for key in sorted(hours)]
+
+    @property
+    def clock(self) -> datetime:
+        """The replayed UTC hour: ``start`` if given, else the first hour recorded."""
+        with self._lock:
+            if self._clock is None:
+                hours = self.hours()
+                self._clock = hours[0] if hours else datetime(1970, 1, 1, tzinfo=timezone.utc)
+            return self._clock
+
+    def seek(self, hour: datetime) -> None:
+        """Set the replay clock to ``hour`` (truncated to the hour, UTC)."""
+        with self._lock:
+            self._clock = _hour(hour)
+
+    def advance(self) -> datetime:
+        """Step the clock to the next recorded hour (it stays on the last one); returns it."""
+        current = self.clock
+        later = [hour for hour in self.hours() if hour > current]
+        if later:
+            self.seek(later[0])
+        return self.clock
+
+    def save(self, signal: str, kind: str, zone: str, params: dict, body: bytes) -> str:
+        """Store one response body, recorded now; returns its path."""
+        folder = self._folder(signal, kind, zone)
+        os.makedirs(folder, exist_ok=True)
+        key = self._key(params, _hour(datetime.now(timezone.utc)))
+        path = os.path.join(folder, f"{key}.json.gz")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # mtime=0 keeps the file bytes identical for identical bodies
+        with open(tmp, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+            gz.write(body)
+        os.replace(tmp, path)
+        return path
+
+    def _find(self, signal: str, kind: str, zone: str, params: dict) -> Optional[str]:
+        folder = self._folder(signal, kind, zone)
+        key = self._key(params, self.clock)
+        path = os.path.join(folder, f"{key}.json.gz")
+        if os.path.exists(path):
+            return path
+        if params:
+            return None
+        keys = self._keys(folder)
+        if not keys:
+            return None
+        earlier = [k for k in keys if k <= key]
+        return os.path.join(folder, f"{earlier[-1] if earlier else keys[0]}.json.gz")
+
+    def load(self, signal: str, kind: str, zone: str, params: dict) -> Optional[bytes]:
+        """The recorded body for a call, or None if nothing suitable was recorded."""
+        path = self._find(signal, kind, zone, params)
+        if path is None:
+            return None
+        with self._lock:
+            body = self._bodies.get(path)
+        if body is None:
+            with gzip.open(path, "rb") as f:
+                body = f.read()
+            with self._lock:
+                self._bodies[path] = body
+        return body
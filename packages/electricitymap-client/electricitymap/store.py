@@ -0,0 +1,153 @@
+"""
+Local time-series store that keeps every fetched history row.
+
+ElectricityMap ``/history`` only covers the last 24 hours; appending each
+response here accumulates a longer record without extra upstream calls.
+Rows are keyed by ``(zone, signal, datetime)``, so appending the same
+response twice is a no-op and a revised copy of an hour (e.g. once an
+estimate is finalised) replaces the stored one. Range reads filter on
+that key, so SQLite only visits the rows inside the requested window.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from electricitymap.records import RECORD_TYPES, parse_datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    zone TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    datetime INTEGER NOT NULL,
+    updated_at INTEGER,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (zone, signal, datetime)
+) WITHOUT ROWID;
+"""
+
+
+def _epoch(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_epoch(value: Optional[int]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+class HistoryStore:
+    """
+    SQLite store of raw history rows, safe to share between threads.
+
+    ``append`` takes rows exactly as the ``/history`` (or ``/latest``)
+    endpoint returns them; ``rows``, ``history`` and ``records`` read them
+    back for any ``[start, end)`` range, oldest first.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def append(self, signal: str, zone: str, rows: Iterable[dict]) -> int:
+        """Upsert rows for one signal and zone; returns how many were new or changed."""
+        if signal not in RECORD_TYPES:
+            raise ValueError(f"Unknown signal {signal!r}")
+        values = [
+            (
+                row.get("zone", zone),
+                signal,
+                _epoch(row["datetime"]),
+                _epoch(row.get("updatedAt")),
+                json.dumps(row, separators=(",", ":"), sort_keys=True),
+            )
+            for row in rows
+        ]
+        if not values:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            with conn:
+                conn.executemany(
+                    "INSERT INTO history (zone, signal, datetime, updated_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (zone, signal, datetime) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, payload = excluded.payload "
+                    "WHERE excluded.payload != history.payload "
+                    "AND coalesce(excluded.updated_at, 0) >= coalesce(history.updated_at, 0)",
+                    values,
+                )
+            return conn.total_changes - before
+
+    def rows(
+        self,
+        signal: str,
+        zone: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Raw rows with ``start <= datetime < end``, oldest first."""
+        sql = "SELECT payload FROM history WHERE zone = ? AND signal = ?"
+        params = [zone, signal]
+        if start is not None:
+            sql += " AND datetime >= ?"
+            params.append(_epoch(start))
+        if end is not None:
+            sql += " AND datetime < ?"
+            params.append(_epoch(end))
+        sql += " ORDER BY datetime"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            payloads = self._connection().execute(sql, params).fetchall()
+        return [json.loads(payload) for (payload,) in payloads]
+
+    def history(self, signal: str, zone: str, start=None, end=None, limit=None) -> dict:
+        """A range in ``/history`` response shape, for code that consumes the raw JSON."""
+        return {"zone": zone, "history": self.rows(signal, zone, start, end, limit)}
+
+    def records(self, signal: str, zone: str, start=None, end=None, limit=None) -> list:
+        """A range as typed records, oldest first."""
+        record_type = RECORD_TYPES[signal]
+        return [record_type.from_json(row, zone) for row in self.rows(signal, zone, start, end, limit)]
+
+    def span(self, signal: str, zone: str) -> dict:
+        """First and last stored hour and the row count for one signal and zone."""
+        with self._lock:
+            first, last, count = (
+                self._connection()
+                .execute(
+                    "SELECT min(datetime), max(datetime), count(*) FROM history "
+                    "WHERE zone = ? AND signal = ?",
+                    (zone, signal),
+                )
+                .fetchone()
+            )
+        return {"first": _from_epoch(first), "last": _from_epoch(last), "rows": count}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
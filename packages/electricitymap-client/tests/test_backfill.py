@@ -0,0 +1,93 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+backfill_module = pytest.importorskip("electricitymap.backfill")
+
+from electricitymap import ElectricityMapError  # noqa: E402
+from electricitymap.records import History  # noqa: E402
+
+START, END = date(2024, 1, 1), date(2024, 1, 5)
+
+
+class FakeClient:
+    """Serves ``/past-range`` with one carbon-intensity row per hour; ``fail`` lists days to fail."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    async def past_range(self, signal, zone, start, end):
+        self.calls.append((start.date(), end.date()))
+        hours = int((end - start) / timedelta(hours=1))
+        stamps = [start + timedelta(hours=i) for i in range(hours)]
+        if any(ts.date() in self.fail for ts in stamps):
+            raise ElectricityMapError("503 from carbon-intensity/past-range", "http", 503)
+        rows = [
+            {
+                "zone": zone,
+                "datetime": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "carbonIntensity": 100.0 + ts.hour,
+            }
+            for ts in stamps
+        ]
+        return History.from_json(signal, zone, {"zone": zone, "data": rows})
+
+
+def _run(root, client, **kwargs):
+    return asyncio.run(
+        backfill_module.backfill(
+            client, str(root), ["carbon-intensity"], ["PT"], START, END, rate=1000, **kwargs
+        )
+    )
+
+
+def test_backfill_writes_one_partition_per_day(tmp_path):
+    client = FakeClient()
+    totals = _run(tmp_path, client, chunk_days=2)
+    assert totals["written"] == 4
+    assert totals["rows"] == 96
+    assert sorted(client.calls) == [(date(2024, 1, 1), date(2024, 1, 3)), (date(2024, 1, 3), date(2024, 1, 5))]
+    df = backfill_module.load(str(tmp_path), "carbon-intensity", "PT")
+    assert len(df) == 96
+    assert df["datetime"].is_monotonic_increasing
+    assert df["datetime"].iloc[0] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_backfill_resumes_after_failed_days(tmp_path):
+    totals = _run(tmp_path, FakeClient(fail={date(2024, 1, 3)}), chunk_days=1)
+    assert (totals["written"], totals["failed"]) == (3, 1)
+    client = FakeClient()
+    totals = _run(tmp_path, client)
+    assert client.calls == [(date(2024, 1, 3), date(2024, 1, 4))]
+    assert (totals["skipped"], totals["written"]) == (3, 1)
+    # Everything is complete now: nothing left to fetch
+    client = FakeClient()
+    assert _run(tmp_path, client)["skipped"] == 4
+    assert client.calls == []
+
+
+def test_backfill_refetches_a_partition_whose_checksum_does_not_match(tmp_path):
+    _run(tmp_path, FakeClient())
+    dataset = backfill_module.Dataset(str(tmp_path), "carbon-intensity", "PT")
+    corrupted = dataset.path(date(2024, 1, 2))
+    with open(corrupted, "ab") as f:
+        f.write(b"garbage")
+    assert not dataset.is_done(date(2024, 1, 2))
+    assert dataset.is_done(date(2024, 1, 1))
+    client = FakeClient()
+    totals = _run(tmp_path, client)
+    assert client.calls == [(date(2024, 1, 2), date(2024, 1, 3))]
+    assert totals["written"] == 1
+    assert backfill_module.Dataset(str(tmp_path), "carbon-intensity", "PT").is_done(date(2024, 1, 2))
+
+
+def test_chunks_split_runs_of_consecutive_days():
+    pending = [date(2024, 1, d) for d in (1, 2, 3, 5, 6)]
+    assert backfill_module.chunks(pending, 2) == [
+        [date(2024, 1, 1), date(2024, 1, 2)],
+        [date(2024, 1, 3)],
+        [date(2024, 1, 5), date(2024, 1, 6)],
+    ]
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from electricitymap import AsyncElectricityMapClient, ElectricityMapClient, ElectricityMapError
+
+httpx = pytest.importorskip("httpx")
+
+LATEST = b'{"zone": "PT", "datetime": "2025-05-01T13:00:00.000Z", "carbonIntensity": 120}'
+
+
+def _async_client(responses, **settings):
+    """Client whose calls are answered in turn by ``responses`` (status, headers)."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status, headers = responses[min(len(calls), len(responses)) - 1]
+        return httpx.Response(status, headers=headers, content=LATEST)
+
+    client = AsyncElectricityMapClient(backoff=0.01, **settings)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def test_async_client_retries_transient_errors():
+    client, calls = _async_client([(503, {}), (200, {})], retries=2)
+    record = asyncio.run(client.latest("carbon-intensity", "PT"))
+    assert record.carbon_intensity == 120
+    assert len(calls) == 2
+    assert client.stats()["carbon-intensity/latest"]["retries"] == 1
+
+
+def test_async_client_honours_a_short_retry_after(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    client, calls = _async_client([(429, {"Retry-After": "2"}), (200, {})], retries=2, timeout=5)
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    asyncio.run(client.request("carbon-intensity", "latest", "PT"))
+    assert delays == [2.0]
+
+
+def test_async_client_surfaces_a_retry_after_longer_than_the_timeout():
+    client, calls = _async_client([(429, {"Retry-After": "3600"}), (200, {})], retries=2, timeout=5)
+    with pytest.raises(ElectricityMapError) as error:
+        asyncio.run(client.request("carbon-intensity", "latest", "PT"))
+    assert (error.value.reason, error.value.status) == ("http", 429)
+    assert len(calls) == 1
+
+
+class _RateLimited(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        self.send_response(429)
+        self.send_header("Retry-After", "3600")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_sync_client_surfaces_a_retry_after_longer_than_the_timeout():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RateLimited)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    try:
+        with ElectricityMapClient(base_url=f"http://{host}:{port}/v3", retries=2, timeout=5) as client:
+            with pytest.raises(ElectricityMapError) as error:
+                client.request("carbon-intensity", "latest", "PT")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert error.value.status == 429
+    assert _RateLimited.calls == 1
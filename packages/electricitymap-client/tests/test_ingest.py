@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+from electricitymap import IncrementalHistory, RingBuffer
+from electricitymap.records import CarbonIntensityRecord
+
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+def _row(hour: int, value: float = None) -> dict:
+    ts = START + timedelta(hours=hour)
+    return {
+        "zone": "PT",
+        "datetime": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "carbonIntensity": float(hour) if value is None else value,
+    }
+
+
+def _push(buffer: RingBuffer, hour: int, value: float = None) -> bool:
+    row = _row(hour, value)
+    return buffer.push(CarbonIntensityRecord.from_json(row), row)
+
+
+def _hours(buffer: RingBuffer) -> list:
+    return [int((record.datetime - START) / timedelta(hours=1)) for record in buffer.records()]
+
+
+def test_ring_buffer_keeps_the_newest_hours_in_order():
+    buffer = RingBuffer(capacity=4)
+    for hour in range(6):
+        assert _push(buffer, hour)
+    assert len(buffer) == 4
+    assert _hours(buffer) == [2, 3, 4, 5]
+    assert buffer.newest.datetime == START + timedelta(hours=5)
+
+
+def test_ring_buffer_replaces_a_repeated_hour():
+    buffer = RingBuffer(capacity=4)
+    for hour in range(4):
+        _push(buffer, hour)
+    assert _push(buffer, 2, 99.0)
+    assert _hours(buffer) == [0, 1, 2, 3]
+    assert buffer.records()[2].carbon_intensity == 99.0
+    assert buffer.rows()[2]["carbonIntensity"] == 99.0
+
+
+def test_ring_buffer_inserts_out_of_order_hours():
+    buffer = RingBuffer(capacity=4)
+    for hour in (0, 1, 3, 4):
+        _push(buffer, hour)
+    assert _push(buffer, 2)
+    assert _hours(buffer) == [1, 2, 3, 4]
+    # Older than everything kept in a full buffer: dropped
+    assert not _push(buffer, 0)
+    assert _hours(buffer) == [1, 2, 3, 4]
+
+
+class FakeClient:
+    """Answers ``/history`` with hours [end - 24, end) and ``/latest`` with hour ``end - 1``."""
+
+    def __init__(self, end: int = 24):
+        self.end = end
+        self.calls = []
+
+    def request(self, signal, kind, zone, **params):
+        self.calls.append(kind)
+        if kind == "latest":
+            return _row(self.end - 1)
+        return {"zone": zone, "history": [_row(hour) for hour in range(self.end - 24, self.end)]}
+
+
+def test_incremental_history_seeds_once_then_polls_latest():
+    client = FakeClient()
+    feed = IncrementalHistory(client, "carbon-intensity", "PT")
+    assert len(feed.refresh()) == 24
+    client.end = 25
+    records = feed.refresh()
+    assert client.calls == ["history", "latest"]
+    assert len(records) == 24
+    assert records[-1].datetime == START + timedelta(hours=24)
+    assert feed.raw()["history"][-1] == _row(24)
+
+
+def test_incremental_history_reseeds_after_a_gap():
+    client = FakeClient()
+    feed = IncrementalHistory(client, "carbon-intensity", "PT")
+    feed.refresh()
+    client.end = 30
+    records = feed.refresh()
+    assert client.calls == ["history", "latest", "history"]
+    assert [record.carbon_intensity for record in records] == [float(hour) for hour in range(6, 30)]
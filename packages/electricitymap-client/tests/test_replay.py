@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from electricitymap import AsyncElectricityMapClient, Cassette, ElectricityMapError
+
+httpx = pytest.importorskip("httpx")
+
+FIRST = datetime(2025, 5, 1, 10, tzinfo=timezone.utc)
+
+
+def _record(directory, hour: datetime, value: float) -> None:
+    """Write a ``latest`` recording for ``hour`` as a record run would have."""
+    folder = os.path.join(directory, "PT", "carbon-intensity", "latest")
+    os.makedirs(folder, exist_ok=True)
+    body = {"zone": "PT", "datetime": hour.strftime("%Y-%m-%dT%H:00:00.000Z"), "carbonIntensity": value}
+    with gzip.open(os.path.join(folder, f"{hour:%Y-%m-%dT%H}.json.gz"), "wb") as f:
+        f.write(json.dumps(body).encode())
+
+
+def _value(cassette: Cassette) -> float:
+    return json.loads(cassette.load("carbon-intensity", "latest", "PT", {}))["carbonIntensity"]
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    # Hours 10, 11 and 13 were recorded; 12 was missed
+    for offset, value in ((0, 100.0), (1, 110.0), (3, 130.0)):
+        _record(str(tmp_path), FIRST + timedelta(hours=offset), value)
+    return str(tmp_path)
+
+
+def test_replay_starts_at_the_first_recorded_hour_and_plays_them_in_order(recorded):
+    cassette = Cassette(recorded, "replay")
+    assert cassette.clock == FIRST
+    assert _value(cassette) == 100.0
+    assert cassette.advance() == FIRST + timedelta(hours=1)
+    assert _value(cassette) == 110.0
+    assert cassette.advance() == FIRST + timedelta(hours=3)
+    assert _value(cassette) == 130.0
+    # Stays on the last recording
+    assert cassette.advance() == FIRST + timedelta(hours=3)
+
+
+def test_replay_serves_the_newest_recording_at_or_before_the_clock(recorded):
+    cassette = Cassette(recorded, "replay", start=FIRST + timedelta(hours=2, minutes=30))
+    assert _value(cassette) == 110.0
+    cassette.seek(FIRST - timedelta(days=1))
+    assert _value(cassette) == 100.0
+    cassette.seek(FIRST + timedelta(days=1))
+    assert _value(cassette) == 130.0
+
+
+def test_replay_does_not_depend_on_the_wall_clock(recorded, monkeypatch):
+    monkeypatch.setenv("ELECTRICITYMAP_REPLAY", "replay")
+    monkeypatch.setenv("ELECTRICITYMAP_REPLAY_DIR", recorded)
+    monkeypatch.setenv("ELECTRICITYMAP_REPLAY_START", "2025-05-01T11:00:00+00:00")
+    assert [_value(Cassette.from_env()) for _ in range(3)] == [110.0] * 3
+
+
+def test_recorded_responses_replay_without_the_network(tmp_path):
+    body = {"zone": "PT", "data": [{"datetime": "2025-05-01T10:00:00.000Z", "carbonIntensity": 99}]}
+
+    def upstream(request):
+        return httpx.Response(200, json=body)
+
+    def offline(request):
+        raise AssertionError("replay must not touch the network")
+
+    async def call(handler, mode):
+        client = AsyncElectricityMapClient(cassette=Cassette(str(tmp_path), mode))
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await client.past_range("carbon-intensity", "PT", FIRST, FIRST + timedelta(hours=1))
+        finally:
+            await client.aclose()
+
+    recorded = asyncio.run(call(upstream, "record"))
+    replayed = asyncio.run(call(offline, "replay"))
+    assert replayed.records == recorded.records
+
+    async def missing():
+        client = AsyncElectricityMapClient(cassette=Cassette(str(tmp_path), "replay"))
+        await client.request("carbon-intensity", "history", "ES")
+
+    with pytest.raises(ElectricityMapError) as error:
+        asyncio.run(missing())
+    assert error.value.reason == "replay"
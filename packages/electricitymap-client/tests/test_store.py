@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from electricitymap import HistoryStore
+
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+def _row(hour: int, value: float, updated: int = 0) -> dict:
+    ts = START + timedelta(hours=hour)
+    return {
+        "zone": "PT",
+        "datetime": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "updatedAt": (ts + timedelta(minutes=updated)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "carbonIntensity": value,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_append_is_idempotent(store):
+    rows = [_row(hour, 100.0 + hour) for hour in range(24)]
+    assert store.append("carbon-intensity", "PT", rows) == 24
+    assert store.append("carbon-intensity", "PT", rows) == 0
+    assert store.rows("carbon-intensity", "PT") == rows
+    assert store.span("carbon-intensity", "PT") == {
+        "first": START,
+        "last": START + timedelta(hours=23),
+        "rows": 24,
+    }
+
+
+def test_newer_revision_replaces_an_hour_but_an_older_one_does_not(store):
+    store.append("carbon-intensity", "PT", [_row(0, 100.0, updated=10)])
+    assert store.append("carbon-intensity", "PT", [_row(0, 120.0, updated=30)]) == 1
+    assert store.append("carbon-intensity", "PT", [_row(0, 90.0, updated=20)]) == 0
+    assert [row["carbonIntensity"] for row in store.rows("carbon-intensity", "PT")] == [120.0]
+
+
+def test_range_reads_are_half_open_and_per_signal(store):
+    store.append("carbon-intensity", "PT", [_row(hour, float(hour)) for hour in range(48)])
+    store.append("carbon-intensity", "ES", [_row(0, 1.0)])
+    records = store.records(
+        "carbon-intensity", "PT", START + timedelta(hours=10), START + timedelta(hours=14)
+    )
+    assert [record.carbon_intensity for record in records] == [10.0, 11.0, 12.0, 13.0]
+    assert len(store.history("carbon-intensity", "PT", limit=5)["history"]) == 5
+    assert store.rows("power-breakdown", "PT") == []
+    with pytest.raises(ValueError):
+        store.append("wind", "PT", [_row(0, 1.0)])
+
+
+def test_rows_survive_reopening(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    first = HistoryStore(path)
+    first.append("carbon-intensity", "PT", [_row(0, 100.0)])
+    first.close()
+    second = HistoryStore(path)
+    assert second.rows("carbon-intensity", "PT") == [_row(0, 100.0)]
+    second.close()